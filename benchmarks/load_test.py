@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import statistics
+import multiprocessing
+import numpy as np
+import pandas as pd
+import requests
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_PATH = os.path.join(REPO_PATH, 'src', 'backend')
+sys.path.insert(0, os.path.join(REPO_PATH, 'src', 'data_download'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_data import FRED_FIELDS, MODELING_FIELDS, YTD_FIELDS, generate_dataset
+from create_modeling_table import stream_modeling_table
+
+LOAD_TEST_RESULTS_PATH = os.path.join(REPO_PATH, 'benchmarks', 'results')
+NON_ANNUALIZE_FIELDS = [field for field in MODELING_FIELDS if field not in YTD_FIELDS]
+
+def get_free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(workers, table_path, dataset_path, work_path, port):
+    """
+    Start the backend under gunicorn, serving a local modeling table.
+
+    Args:
+    workers (int): Number of gunicorn worker processes.
+    table_path (str): Path to the modeling table CSV file to serve.
+    dataset_path (str): Directory for the shared dataset.
+    work_path (str): Working directory of the server, where it writes its request log.
+    port (int): Port to listen on.
+
+    Returns:
+    subprocess.Popen: The gunicorn master process.
+    """
+    env = dict(
+        os.environ,
+        PYTHONPATH=BACKEND_PATH,
+        WEB_CONCURRENCY=str(workers),
+        DATASET_SOURCE_PATH=table_path,
+        DATASET_PATH=dataset_path,
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(work_path, 'prometheus'),
+    )
+    command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(BACKEND_PATH, 'gunicorn.conf.py'), '--bind', f'127.0.0.1:{port}', 'app:app']
+    return subprocess.Popen(command, cwd=work_path, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def wait_for_server(base_url, timeout=60):
+    """
+    Wait until the backend answers /checkin.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with contextlib.suppress(requests.ConnectionError):
+            if requests.get(f'{base_url}/checkin', timeout=1).ok:
+                return
+        time.sleep(0.2)
+    raise TimeoutError(f"Backend at {base_url} did not start within {timeout}s")
+
+def get_server_memory_mb(pid):
+    """
+    Return the proportional set size (PSS) of a process and its children in MB, or None where /proc is not available.
+
+    PSS splits shared pages between the processes mapping them, so the mapped dataset is counted once however many
+    workers use it.
+    """
+    def children(pid):
+        with contextlib.suppress(OSError):
+            with open(f'/proc/{pid}/task/{pid}/children') as f:
+                return [int(child) for child in f.read().split()]
+        return []
+
+    total_kb = 0
+    for process_id in [pid] + children(pid):
+        try:
+            with open(f'/proc/{process_id}/smaps_rollup') as f:
+                total_kb += sum(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+        except OSError:
+            return None
+    return total_kb / 1024
+
+def client_loop(base_url, payloads, duration, seed, results):
+    """
+    Post /process requests back to back for `duration` seconds and report the latencies.
+    """
+    rng = np.random.default_rng(seed)
+    session = requests.Session()
+    latencies = []
+    errors = 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        payload = payloads[rng.integers(len(payloads))]
+        start_time = time.perf_counter()
+        try:
+            # Banks whose data cannot be fitted still count as served; only failed requests are errors
+            ok = session.post(f'{base_url}/process', json=payload, timeout=30).ok
+        except requests.RequestException:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - start_time)
+        else:
+            errors += 1
+    results.put((latencies, errors))
+
+def run_load_test(base_url, payloads, clients, duration):
+    """
+    Drive the backend with concurrent client processes.
+
+    Args:
+    base_url (str): Backend URL.
+    payloads (list): /process request bodies to pick from at random.
+    clients (int): Number of concurrent client processes.
+    duration (float): Seconds to run for.
+
+    Returns:
+    dict: Successful requests, errors, requests per second and latency percentiles in milliseconds.
+    """
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=client_loop, args=(base_url, payloads, duration, seed, results)) for seed in range(clients)]
+    start_time = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed_time = time.perf_counter() - start_time
+
+    latencies = sorted(latency for latency_list, _ in outcomes for latency in latency_list)
+    result = {
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in outcomes),
+        'requests_per_second': len(latencies) / elapsed_time,
+    }
+    if latencies:
+        result['p50_ms'] = statistics.median(latencies) * 1000
+        result['p95_ms'] = latencies[int(0.95 * (len(latencies) - 1))] * 1000
+    return result
+
+def load_payloads(table_path):
+    """
+    Build a /process request body for each bank in the modeling table.
+    """
+    certs = pd.to_numeric(pd.read_csv(table_path, usecols=['cert'])['cert'], errors='coerce').dropna().astype(int).unique()
+    return [{'bank_name': f'Bank {cert}', 'cert': int(cert), 'assets': 0, 'model': 'linear regression'} for cert in certs]
+
+def run_scaling_test(table_path, work_path, worker_counts, clients, duration):
+    """
+    Load test the backend once per worker count, each with a freshly built shared dataset.
+
+    Args:
+    table_path (str): Path to the modeling table CSV file to serve.
+    work_path (str): Directory for the servers' datasets and request logs.
+    worker_counts (list): Numbers of gunicorn workers to test.
+    clients (int): Number of concurrent client processes.
+    duration (float): Seconds per load test.
+
+    Returns:
+    dict: Worker count -> load test result, including the server's memory after the test.
+    """
+    payloads = load_payloads(table_path)
+    results = {}
+    for workers in worker_counts:
+        server_path = os.path.join(work_path, f'workers_{workers}')
+        os.makedirs(server_path, exist_ok=True)
+        port = get_free_port()
+        server = start_server(workers, table_path, os.path.join(server_path, 'dataset'), server_path, port)
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            wait_for_server(base_url)
+            # Warm up every worker so the dataset is mapped before timing
+            run_load_test(base_url, payloads, clients, 1)
+            results[workers] = run_load_test(base_url, payloads, clients, duration)
+            results[workers]['server_pss_mb'] = get_server_memory_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        print(f"{workers} workers: {results[workers]['requests_per_second']:.1f} req/s")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend under gunicorn at several worker counts.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Worker counts to test')
+    parser.add_argument('--clients', type=int, help='Concurrent client processes (default: twice the largest worker count)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per load test')
+    parser.add_argument('--table', type=str, help='Modeling table CSV file to serve (default: built from synthetic data)')
+    parser.add_argument('--certs', type=int, default=1000, help='Number of distinct certs in the synthetic data')
+    parser.add_argument('--quarters', type=int, default=40, help='Number of quarters in the synthetic data')
+    parser.add_argument('--output', type=str, help='Results JSON file (default: benchmarks/results/load_test_<timestamp>.json)')
+    args = parser.parse_args()
+    clients = args.clients or 2 * max(args.workers)
+
+    with tempfile.TemporaryDirectory() as work_path:
+        table_path = args.table
+        if table_path is None:
+            print(f"Generating synthetic data: {args.certs} certs, {args.quarters} quarters")
+            paths = generate_dataset(os.path.join(work_path, 'data'), args.certs, args.quarters)
+            table_path = os.path.join(work_path, 'bank_data_rank200.csv')
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                stream_modeling_table(paths['fdic_data_path'], paths['fred_data_path'], paths['best_ranks_path'], table_path, YTD_FIELDS, NON_ANNUALIZE_FIELDS, FRED_FIELDS, 200, 1950)
+        results = run_scaling_test(os.path.abspath(table_path), work_path, args.workers, clients, args.duration)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cpu_count': os.cpu_count(),
+        'clients': clients,
+        'duration': args.duration,
+        'results': results,
+    }
+    output_path = args.output or os.path.join(LOAD_TEST_RESULTS_PATH, f"load_test_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline_rps = results[args.workers[0]]['requests_per_second']
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'PSS MB':>8}")
+    for workers, result in results.items():
+        speedup = result['requests_per_second'] / baseline_rps if baseline_rps else float('nan')
+        pss = f"{result['server_pss_mb']:.0f}" if result['server_pss_mb'] is not None else 'n/a'
+        print(f"{workers:>7} {result['requests_per_second']:>9.1f} {speedup:>7.2f}x {result.get('p50_ms', float('nan')):>8.1f} {result.get('p95_ms', float('nan')):>8.1f} {result['errors']:>7} {pss:>8}")
+    print(f"Results saved to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import statistics
+import numpy as np
+import pandas as pd
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_PATH, 'src', 'data_download'))
+sys.path.insert(0, os.path.join(REPO_PATH, 'src'))
+sys.path.insert(0, os.path.join(REPO_PATH, 'src', 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_data import FRED_FIELDS, MODELING_FIELDS, YTD_FIELDS, generate_dataset
+from create_modeling_table import annualize_ytd_fields, merge_with_fred_data, process_fdic_data, stream_modeling_table
+from processFDIC_RankAssets import get_best_ranks
+from dataset import SharedDataset, build_dataset, file_version
+import lookup
+
+BENCHMARK_RESULTS_PATH = os.path.join(REPO_PATH, 'benchmarks', 'results')
+NON_ANNUALIZE_FIELDS = [field for field in MODELING_FIELDS if field not in YTD_FIELDS]
+
+class LocalS3Client:
+    """Stands in for the boto3 S3 client in the backend, serving the modeling table from a local file."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': os.path.getsize(self.file_path), 'ETag': f'"{file_version(self.file_path)}"'}
+
+    def download_file(self, Bucket, Key, Filename):
+        shutil.copyfile(self.file_path, Filename)
+
+def time_stage(func, repeats):
+    """
+    Time a benchmark stage, silencing its progress output.
+
+    Args:
+    func (callable): Zero-argument function running the stage; may return a row count.
+    repeats (int): Number of timed runs.
+
+    Returns:
+    dict: Best and median wall time in seconds, the number of runs and the rows processed per run.
+    """
+    timings = []
+    rows = None
+    for _ in range(repeats):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start_time = time.perf_counter()
+            rows = func()
+            timings.append(time.perf_counter() - start_time)
+
+    result = {'seconds': min(timings), 'median_seconds': statistics.median(timings), 'repeats': repeats}
+    if rows is not None:
+        result['rows'] = int(rows)
+        result['rows_per_second'] = rows / min(timings) if min(timings) > 0 else None
+    return result
+
+def load_backend_app(table_path, work_path):
+    """
+    Import the backend Flask app with S3 access redirected to a local copy of the modeling table.
+
+    Args:
+    table_path (str): Path to the modeling table CSV file to serve.
+    work_path (str): Directory for the backend's dataset.
+
+    Returns:
+    module: The backend app module.
+    """
+    import app as backend_app
+    backend_app.get_s3_client = lambda: LocalS3Client(table_path)
+    backend_app.DATASET = SharedDataset(os.path.join(work_path, 'dataset'), backend_app.get_dataset_version, backend_app.fetch_dataset_csv)
+    return backend_app
+
+def run_benchmarks(paths, work_path, repeats=3, n_queries=50):
+    """
+    Run the benchmark for each pipeline stage against a synthetic dataset.
+
+    Args:
+    paths (dict): Paths returned by synthetic_data.generate_dataset.
+    work_path (str): Directory for intermediate outputs.
+    repeats (int): Number of timed runs per stage.
+    n_queries (int): Number of lookup queries.
+
+    Returns:
+    dict: Stage name -> timing result.
+    """
+    results = {}
+
+    def run_process_fdic_data():
+        return len(process_fdic_data(paths['fdic_data_path'], YTD_FIELDS, NON_ANNUALIZE_FIELDS, 1950))
+    results['process_fdic_data'] = time_stage(run_process_fdic_data, repeats)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        fdic_df = process_fdic_data(paths['fdic_data_path'], YTD_FIELDS, NON_ANNUALIZE_FIELDS, 1950)
+
+    results['annualize_ytd_fields'] = time_stage(lambda: len(annualize_ytd_fields(fdic_df.copy(), YTD_FIELDS)), repeats)
+    results['get_best_ranks'] = time_stage(lambda: len(get_best_ranks(paths['fdic_data_path'])), repeats)
+    results['merge_with_fred_data'] = time_stage(lambda: len(merge_with_fred_data(fdic_df.copy(), paths['fred_data_path'], FRED_FIELDS)), repeats)
+
+    # Lookup: the same perturbed names through the full scan and the trigram index
+    details_df = lookup.load_data(paths['best_ranks_path'])
+    queries = details_df['Institution_Name'].sample(min(n_queries, len(details_df)), random_state=0).str.upper().str.replace('BANK', 'BK').tolist()
+    results['lookup.fuzzy_search'] = time_stage(lambda: sum(len(lookup.fuzzy_search(details_df, query)) for query in queries), repeats)
+    index = lookup.build_index(details_df)
+    results['lookup.indexed_search'] = time_stage(lambda: len(lookup.resolve_names(index, queries)), repeats)
+
+    # Backend /process for a large bank, served from a locally built modeling table
+    table_path = os.path.join(work_path, 'bank_data_rank200_source.csv')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        stream_modeling_table(paths['fdic_data_path'], paths['fred_data_path'], paths['best_ranks_path'], table_path, YTD_FIELDS, NON_ANNUALIZE_FIELDS, FRED_FIELDS, 200, 1950)
+    os.makedirs(os.path.join(work_path, 'dataset_build'), exist_ok=True)
+    results['backend.build_dataset'] = time_stage(lambda: build_dataset(table_path, os.path.join(work_path, 'dataset_build'), 'benchmark'), repeats)
+    backend_app = load_backend_app(table_path, work_path)
+    client = backend_app.app.test_client()
+    # The largest bank with a complete deposit expense series, since /process cannot fit missing quarters
+    table_df = pd.read_csv(table_path, usecols=['cert', 'deposit_expense_rate'])
+    incomplete_certs = pd.to_numeric(table_df.loc[table_df['deposit_expense_rate'].isna(), 'cert'], errors='coerce')
+    top_bank = details_df[~details_df['Cert'].isin(incomplete_certs)].sort_values('Best_Asset_Rank').iloc[0]
+    payload = {'bank_name': top_bank['Institution_Name'], 'cert': int(top_bank['Cert']), 'assets': float(top_bank['Asset_Value']), 'model': 'linear regression'}
+
+    def run_backend_process():
+        response = client.post('/process', json=payload)
+        if 'error' in response.get_json()['model_results']:
+            raise RuntimeError(f"Backend /process failed: {response.get_json()['model_results']['error']}")
+        return 1
+    results['backend./process'] = time_stage(run_backend_process, repeats)
+
+    # Backend /process_batch for the 50 largest banks in one request
+    batch_payload = {'certs': details_df.sort_values('Best_Asset_Rank')['Cert'].head(50).astype(int).tolist(), 'model': 'linear regression'}
+
+    def run_backend_process_batch():
+        response = client.post('/process_batch', json=batch_payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"Backend /process_batch failed: {response.get_json()['error']}")
+        return len(response.get_json()['results'])
+    results['backend./process_batch'] = time_stage(run_backend_process_batch, repeats)
+
+    # Backend /scenarios: 100 fed funds paths over 12 quarters for every bank in the modeling table
+    rng = np.random.default_rng(0)
+    scenario_paths = np.clip(0.03 + np.cumsum(rng.normal(0, 0.0025, (100, 12)), axis=1), 0, None)
+    scenario_payload = {'scenarios': [{'name': f'scenario_{i}', 'path': path.tolist()} for i, path in enumerate(scenario_paths)], 'model': 'error correction'}
+
+    def run_backend_scenarios():
+        response = client.post('/scenarios', json=scenario_payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"Backend /scenarios failed: {response.get_json()['error']}")
+        return len(response.get_json()['banks']) * len(scenario_paths)
+    results['backend./scenarios'] = time_stage(run_backend_scenarios, repeats)
+
+    return results
+
+def check_regressions(results, baseline, threshold):
+    """
+    Compare benchmark results with a baseline.
+
+    Args:
+    results (dict): Stage name -> timing result for this run.
+    baseline (dict): Stage name -> timing result for the baseline run.
+    threshold (float): Allowed slowdown as a fraction of the baseline time (0.25 allows 25% slower).
+
+    Returns:
+    list: A message for each stage slower than the threshold allows.
+    """
+    regressions = []
+    for stage, result in results.items():
+        if stage in baseline and result['seconds'] > baseline[stage]['seconds'] * (1 + threshold):
+            regressions.append(f"{stage}: {result['seconds']:.4f}s vs baseline {baseline[stage]['seconds']:.4f}s (+{result['seconds'] / baseline[stage]['seconds'] - 1:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data pipeline stages on synthetic data.")
+    parser.add_argument('--certs', type=int, default=1000, help='Number of distinct certs')
+    parser.add_argument('--quarters', type=int, default=40, help='Number of quarters')
+    parser.add_argument('--fields', type=int, default=len(MODELING_FIELDS), help='Number of fields per cert')
+    parser.add_argument('--repeats', type=int, default=3, help='Number of timed runs per stage')
+    parser.add_argument('--data-path', type=str, help='Reuse (or generate into) this synthetic data directory')
+    parser.add_argument('--output', type=str, help='Results JSON file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--baseline', type=str, help='Results JSON file to check for regressions against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown against the baseline (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_path:
+        data_path = args.data_path or os.path.join(work_path, 'data')
+        if os.path.isdir(os.path.join(data_path, 'raw', 'fdic')):
+            paths = {
+                'fdic_data_path': os.path.join(data_path, 'raw', 'fdic'),
+                'fred_data_path': os.path.join(data_path, 'raw', 'rates', 'fred_data.csv'),
+                'best_ranks_path': os.path.join(data_path, 'processed', 'institution_details.csv'),
+            }
+        else:
+            print(f"Generating synthetic data: {args.certs} certs, {args.quarters} quarters, {args.fields} fields")
+            paths = generate_dataset(data_path, args.certs, args.quarters, args.fields)
+
+        current_path = os.getcwd()
+        os.chdir(work_path)  # The backend writes its request log to the working directory
+        try:
+            results = run_benchmarks(paths, work_path, args.repeats)
+        finally:
+            os.chdir(current_path)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'scale': {'certs': args.certs, 'quarters': args.quarters, 'fields': args.fields, 'data_path': args.data_path},
+        'results': results,
+    }
+
+    output_path = args.output or os.path.join(BENCHMARK_RESULTS_PATH, f"{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for stage, result in results.items():
+        print(f"{stage:<24} {result['seconds']:>9.4f}s (median {result['median_seconds']:.4f}s)")
+    print(f"Results saved to {output_path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['scale'] != report['scale']:
+            print(f"Warning: baseline scale {baseline['scale']} differs from {report['scale']}")
+        regressions = check_regressions(results, baseline['results'], args.threshold)
+        if regressions:
+            print("Performance regressions:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print(f"No stage is more than {args.threshold:.0%} slower than {args.baseline}")
+
+if __name__ == "__main__":
+    main()
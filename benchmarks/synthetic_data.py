@@ -0,0 +1,181 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+# Fields read by the modeling table; extra fields are named EXTRA1, EXTRA2, ...
+MODELING_FIELDS = ['EDEPDOM', 'INTINCY', 'NONII', 'DEPDOM', 'DEP', 'DEPFOR', 'DEPNIDOM', 'DEPIDOM', 'BRO', 'DEPINS', 'LNLSNET', 'SC', 'ASSET', 'LNCON']
+YTD_FIELDS = ['EDEPDOM', 'INTINCY', 'NONII']
+FRED_FIELDS = ['ff_t', 'ff_e', 't_1m', 't_3m', 't_6m', 't_12m', 't_2y', 't_3y', 't_5y', 't_7y', 't_10y', 't_30y']
+
+def generate_fdic_data(fdic_data_path, n_certs=1000, n_quarters=40, n_fields=len(MODELING_FIELDS), end_date='2023-12-31', seed=0):
+    """
+    Write long-format FDIC quarter files (Date, Cert, Field, Value) like the ones saved by dataDownload_fdic.py.
+
+    Bank sizes are log-normal and drift over time, balance sheet fields are consistent fractions of assets, the
+    income fields are year-to-date, and banks enter and leave the panel.
+
+    Args:
+    fdic_data_path (str): Directory to write the quarter files to.
+    n_certs (int): Number of distinct certs over the whole panel.
+    n_quarters (int): Number of quarters, ending at end_date.
+    n_fields (int): Number of fields per cert; the modeling fields come first.
+    end_date (str): Last report date.
+    seed (int): Random seed.
+
+    Returns:
+    pd.DataFrame: Cert, Institution_Name and the asset value of each cert in its largest quarter.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(fdic_data_path, exist_ok=True)
+
+    fields = (MODELING_FIELDS + [f'EXTRA{i}' for i in range(1, n_fields)])[:n_fields]
+    dates = pd.date_range(end=end_date, periods=n_quarters, freq='QE')
+    certs = np.sort(rng.choice(np.arange(1, n_certs * 20), size=n_certs, replace=False))
+
+    # Each bank is active over a random span of quarters, with a random-walk asset size in thousands of dollars
+    first_quarter = np.where(rng.random(n_certs) < 0.7, 0, rng.integers(0, n_quarters, n_certs))
+    last_quarter = np.where(rng.random(n_certs) < 0.7, n_quarters - 1, rng.integers(0, n_quarters, n_certs))
+    last_quarter = np.maximum(first_quarter, last_quarter)
+    log_assets = rng.normal(12.5, 1.6, n_certs)
+    shares = {
+        'DEP': rng.uniform(0.7, 0.9, n_certs), 'DEPFOR': rng.uniform(0.0, 0.03, n_certs),
+        'DEPNIDOM': rng.uniform(0.1, 0.35, n_certs), 'BRO': rng.uniform(0.0, 0.1, n_certs),
+        'DEPINS': rng.uniform(0.4, 0.9, n_certs), 'LNLSNET': rng.uniform(0.4, 0.75, n_certs),
+        'SC': rng.uniform(0.1, 0.35, n_certs), 'LNCON': rng.uniform(0.0, 0.08, n_certs),
+    }
+    best_assets = np.zeros(n_certs)
+    ytd = {field: np.zeros(n_certs) for field in YTD_FIELDS}
+
+    for q, date in enumerate(dates):
+        log_assets += rng.normal(0.01, 0.03, n_certs)
+        asset = np.round(np.exp(log_assets))
+        best_assets = np.maximum(best_assets, np.where((first_quarter <= q) & (q <= last_quarter), asset, 0))
+
+        dep = asset * shares['DEP']
+        depdom = dep * (1 - shares['DEPFOR'])
+        quarter_rate = rng.uniform(0.001, 0.01, n_certs)
+        if date.month == 3:
+            for field in YTD_FIELDS:
+                ytd[field][:] = 0
+        ytd['EDEPDOM'] += depdom * quarter_rate
+        ytd['INTINCY'] += asset * rng.uniform(0.008, 0.015, n_certs)
+        ytd['NONII'] += asset * rng.uniform(0.001, 0.004, n_certs)
+
+        values = {
+            'ASSET': asset, 'DEP': dep, 'DEPDOM': depdom, 'DEPFOR': dep - depdom,
+            'DEPNIDOM': depdom * shares['DEPNIDOM'], 'DEPIDOM': depdom * (1 - shares['DEPNIDOM']),
+            'BRO': depdom * shares['BRO'], 'DEPINS': depdom * shares['DEPINS'],
+            'LNLSNET': asset * shares['LNLSNET'], 'SC': asset * shares['SC'], 'LNCON': asset * shares['LNCON'],
+            **ytd,
+        }
+        value_matrix = np.column_stack([
+            np.round(values[field]) if field in values else np.round(rng.uniform(0, 1, n_certs) * asset)
+            for field in fields
+        ])
+
+        # Rows are grouped by cert, as written by build_dataframe_for_date; a few field values are missing
+        active = np.flatnonzero((first_quarter <= q) & (q <= last_quarter))
+        present = rng.random((len(active), len(fields))) > 0.01
+        cert_rows, field_columns = np.nonzero(present)
+        quarter_df = pd.DataFrame({
+            'Date': date.strftime('%Y%m%d'),
+            'Cert': certs[active][cert_rows],
+            'Field': np.array(fields)[field_columns],
+            'Value': value_matrix[active][cert_rows, field_columns],
+        })
+        quarter_df.to_csv(os.path.join(fdic_data_path, f"{date.strftime('%Y%m%d')}.csv"), index=False)
+
+    return pd.DataFrame({'Cert': certs, 'Institution_Name': [generate_bank_name(rng) for _ in certs], 'Asset_Value': best_assets})
+
+def generate_bank_name(rng):
+    """
+    Generate a plausible bank name.
+
+    Args:
+    rng (np.random.Generator): Random generator.
+
+    Returns:
+    str: Bank name.
+    """
+    places = ['First', 'Citizens', 'Farmers', 'Peoples', 'Community', 'Security', 'Heritage', 'Pinnacle', 'Summit', 'Valley',
+              'River', 'Lake', 'Prairie', 'Mountain', 'Coastal', 'Union', 'Liberty', 'Frontier', 'Home', 'Capital']
+    states = ['Texas', 'Ohio', 'Iowa', 'Kansas', 'Georgia', 'Oregon', 'Maine', 'Utah', 'Nevada', 'Vermont']
+    kinds = ['Bank', 'National Bank', 'State Bank', 'Savings Bank', 'Bank and Trust Company', 'Federal Savings Bank']
+    suffix = rng.choice(['', ', National Association', ', N.A.', ', Inc.'])
+    return f"{rng.choice(places)} {rng.choice(places)} {rng.choice(kinds)} of {rng.choice(states)} {rng.integers(1, 1000)}{suffix}"
+
+def generate_fred_data(fred_data_path, start_date='1990-01-01', end_date='2024-03-31', seed=0):
+    """
+    Write a FRED rate file in percent, like the one saved by dataDownload_fred.py, with gaps on some days.
+
+    Args:
+    fred_data_path (str): Path to write the CSV file to.
+    start_date (str): First date.
+    end_date (str): Last date.
+    seed (int): Random seed.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date, end_date, freq='B')
+    short_rate = np.clip(3 + np.cumsum(rng.normal(0, 0.03, len(dates))), 0, 10)
+
+    columns = {}
+    for i, field in enumerate(FRED_FIELDS):
+        values = np.round(np.clip(short_rate + 0.15 * i + rng.normal(0, 0.02, len(dates)), 0, None), 2)
+        values[rng.random(len(dates)) < 0.03] = np.nan
+        columns[field] = values
+
+    os.makedirs(os.path.dirname(fred_data_path) or '.', exist_ok=True)
+    pd.DataFrame(columns, index=pd.Index(dates, name=None)).to_csv(fred_data_path)
+
+def generate_institution_details(institutions_df, best_ranks_path):
+    """
+    Write an institution details file like the one saved by processFDIC_RankAssets.py.
+
+    Args:
+    institutions_df (pd.DataFrame): DataFrame returned by generate_fdic_data.
+    best_ranks_path (str): Path to write the CSV file to.
+    """
+    details_df = institutions_df.assign(
+        Best_Asset_Rank=institutions_df['Asset_Value'].rank(method='min', ascending=False),
+        Filename='synthetic.csv',
+    )[['Cert', 'Best_Asset_Rank', 'Asset_Value', 'Filename', 'Institution_Name']]
+
+    os.makedirs(os.path.dirname(best_ranks_path) or '.', exist_ok=True)
+    details_df.to_csv(best_ranks_path, index=False)
+
+def generate_dataset(data_path, n_certs=1000, n_quarters=40, n_fields=len(MODELING_FIELDS), seed=0):
+    """
+    Write a complete synthetic data directory with the layout the pipeline scripts expect.
+
+    Args:
+    data_path (str): Root data directory (the equivalent of ./data).
+    n_certs (int): Number of distinct certs.
+    n_quarters (int): Number of quarters.
+    n_fields (int): Number of fields per cert.
+    seed (int): Random seed.
+
+    Returns:
+    dict: Paths of the generated FDIC directory, FRED file and institution details file.
+    """
+    paths = {
+        'fdic_data_path': os.path.join(data_path, 'raw', 'fdic'),
+        'fred_data_path': os.path.join(data_path, 'raw', 'rates', 'fred_data.csv'),
+        'best_ranks_path': os.path.join(data_path, 'processed', 'institution_details.csv'),
+    }
+    institutions_df = generate_fdic_data(paths['fdic_data_path'], n_certs, n_quarters, n_fields, seed=seed)
+    generate_fred_data(paths['fred_data_path'], seed=seed)
+    generate_institution_details(institutions_df, paths['best_ranks_path'])
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic FDIC and FRED data.")
+    parser.add_argument('data_path', type=str, help='Root data directory to write to')
+    parser.add_argument('--certs', type=int, default=1000, help='Number of distinct certs')
+    parser.add_argument('--quarters', type=int, default=40, help='Number of quarters')
+    parser.add_argument('--fields', type=int, default=len(MODELING_FIELDS), help='Number of fields per cert')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.data_path, args.certs, args.quarters, args.fields, args.seed)
+    print(f"Synthetic data written to {args.data_path}: {paths}")
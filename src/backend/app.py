@@ -1,12 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import json
 import boto3
 import os
+import time
+import shutil
+import itertools
 from dotenv import load_dotenv
+import numpy as np
 import pandas as pd
 from sklearn.linear_model import LinearRegression
 import logging
-from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST
+from botocore.exceptions import BotoCoreError, ClientError
+from prometheus_client import Counter, CollectorRegistry, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+from betas import MODEL_TYPES, RATE_FIELDS, find_certs, get_model_results, select_results
+from scenarios import project_scenarios, to_json_values
+from dataset import DATASET_PATH, SharedDataset, file_version, get_bank_rows
 
 # Load environment variables
 load_dotenv()
@@ -17,6 +25,23 @@ app = Flask(__name__)
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Modeling table on S3
+BUCKET_NAME = 'deposit-betas'
+OBJECT_KEY = 'data/processed/bank_data_rank200.csv'
+
+# Serve a local modeling table CSV file instead of the S3 copy, e.g. for development and load tests
+DATASET_SOURCE_PATH = os.getenv('DATASET_SOURCE_PATH')
+
+# Institution details (Cert, Best_Asset_Rank, ...) for rank range requests, from S3 or a local file
+INSTITUTION_DETAILS_KEY = 'data/processed/institution_details.csv'
+INSTITUTION_DETAILS_SOURCE_PATH = os.getenv('INSTITUTION_DETAILS_SOURCE_PATH')
+
+# JSON file mapping peer group names to lists of certs
+PEER_GROUPS_PATH = os.getenv('PEER_GROUPS_PATH', '/app/peer_groups.json')
+
+# How often each worker checks for a new version of the modeling table
+DATASET_REFRESH_SECONDS = int(os.getenv('DATASET_REFRESH_SECONDS', '300'))
+
 # Prometheus counters
 REQUEST_COUNTER = Counter('backend_requests_total', 'Total number of requests processed by the backend')
 
@@ -38,6 +63,53 @@ def get_s3_client():
         session = boto3.Session(region_name=aws_region)
         return session.client('s3')
 
+def get_dataset_version():
+    if DATASET_SOURCE_PATH:
+        return file_version(DATASET_SOURCE_PATH)
+    response = get_s3_client().head_object(Bucket=BUCKET_NAME, Key=OBJECT_KEY)
+    return response['ETag'].strip('"')
+
+def fetch_dataset_csv(destination_path):
+    if DATASET_SOURCE_PATH:
+        shutil.copyfile(DATASET_SOURCE_PATH, destination_path)
+    else:
+        get_s3_client().download_file(BUCKET_NAME, OBJECT_KEY, destination_path)
+        logger.debug("Downloaded bank_data_rank200.csv from S3")
+
+# Memory-mapped modeling table shared by all workers; built by whichever process needs it first
+DATASET = SharedDataset(DATASET_PATH, get_dataset_version, fetch_dataset_csv, DATASET_REFRESH_SECONDS)
+
+_institution_details = {'df': None, 'loaded_at': 0.0}
+
+def get_institution_details():
+    if _institution_details['df'] is None or time.time() - _institution_details['loaded_at'] > DATASET_REFRESH_SECONDS:
+        if INSTITUTION_DETAILS_SOURCE_PATH:
+            df = pd.read_csv(INSTITUTION_DETAILS_SOURCE_PATH)
+        else:
+            df = pd.read_csv(get_s3_client().get_object(Bucket=BUCKET_NAME, Key=INSTITUTION_DETAILS_KEY)['Body'])
+        _institution_details.update(df=df, loaded_at=time.time())
+    return _institution_details['df']
+
+def resolve_batch_certs(data):
+    """
+    Return the certs a batch request asks for: an explicit 'certs' list, an inclusive 'rank_range' of best asset
+    ranks, or a named 'peer_group'.
+    """
+    if 'certs' in data:
+        return [int(cert) for cert in data['certs']]
+    if 'rank_range' in data:
+        min_rank, max_rank = data['rank_range']
+        details_df = get_institution_details()
+        details_df = details_df[details_df['Best_Asset_Rank'].between(min_rank, max_rank)].sort_values('Best_Asset_Rank')
+        return details_df['Cert'].astype(int).tolist()
+    if 'peer_group' in data:
+        with open(PEER_GROUPS_PATH) as f:
+            peer_groups = json.load(f)
+        if data['peer_group'] not in peer_groups:
+            raise ValueError(f"Unknown peer group: {data['peer_group']}")
+        return [int(cert) for cert in peer_groups[data['peer_group']]]
+    raise ValueError("Request needs one of 'certs', 'rank_range' or 'peer_group'")
+
 @app.route('/checkin')
 def checkin():
     return "Backend is running."
@@ -60,26 +132,14 @@ def process():
         json.dump(log_entry, log_file)
         log_file.write('\n')
 
-    # Check if the bank_data_rank200.csv file exists on S3
-    s3_client = get_s3_client()
-    bucket_name = 'deposit-betas'
-    object_key = 'data/processed/bank_data_rank200.csv'
-
     try:
-        s3_client.head_object(Bucket=bucket_name, Key=object_key)
+        # Map the current modeling table, building it first if S3 has a new version
+        dataset = DATASET.get()
         s3_message = "I can see bank_data_rank200.csv"
-        logger.debug(s3_message)
-        
-        # Download the file
-        s3_client.download_file(bucket_name, object_key, '/app/bank_data_rank200.csv')
-        logger.debug("Downloaded bank_data_rank200.csv from S3")
-        
-        # Load the CSV file
-        df = pd.read_csv('/app/bank_data_rank200.csv')
-        logger.debug(f"Loaded CSV file with columns: {df.columns.tolist()}")
-        
-        # Filter records by cert
-        bank_data = df[df['cert'] == int(cert)]
+        logger.debug(f"Using dataset version {dataset['version']}")
+
+        # Rows for this cert
+        bank_data = get_bank_rows(dataset, int(cert))
         logger.debug(f"Filtered data for cert {cert}: {bank_data.head()}")
 
         # Ensure the necessary columns are present
@@ -109,6 +169,112 @@ def process():
 
     return jsonify({'result': result, 's3_message': s3_message, 'model_results': model_results})
 
+@app.route('/process_batch', methods=['POST'])
+def process_batch():
+    REQUEST_COUNTER.inc()
+    data = request.json
+    model_type = data.get('model', 'linear regression')
+    if model_type not in MODEL_TYPES:
+        return jsonify({'error': f"Unknown model type: {model_type}"}), 400
+
+    try:
+        certs = resolve_batch_certs(data)
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except (BotoCoreError, ClientError) as e:
+        logger.warning(f"Error loading institution details: {e}")
+        return jsonify({'error': f"Error loading institution details: {e}"}), 500
+    logger.debug(f"Received batch request for {len(certs)} certs with model {model_type}")
+
+    with open('log.json', 'a') as log_file:
+        log_entry = {'certs': certs, 'model': model_type, 'result': f"Batch of {len(certs)} banks; Model: {model_type}"}
+        json.dump(log_entry, log_file)
+        log_file.write('\n')
+
+    try:
+        # Every bank is fitted in one pass per dataset version and model type; requests only look results up
+        dataset = DATASET.get()
+        results = select_results(get_model_results(dataset, model_type), certs, model_type)
+    except Exception as e:
+        logger.debug(f"Error fitting batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    if data.get('stream'):
+        return Response((json.dumps(result) + '\n' for result in results), mimetype='application/x-ndjson')
+    return jsonify({'model_type': MODEL_TYPES[model_type], 'dataset_version': dataset['version'], 'results': results})
+
+@app.route('/scenarios', methods=['POST'])
+def scenarios():
+    REQUEST_COUNTER.inc()
+    data = request.json
+    model_type = data.get('model', 'linear regression')
+    rate_field = data.get('rate_field', 'ff_t')
+    if model_type not in MODEL_TYPES:
+        return jsonify({'error': f"Unknown model type: {model_type}"}), 400
+    if rate_field not in RATE_FIELDS:
+        return jsonify({'error': f"Unknown rate field: {rate_field}"}), 400
+
+    # Rate paths, one per scenario, with a value for each quarter ahead: [{'name': 'base', 'path': [0.05, ...]}, ...]
+    try:
+        scenario_names = [scenario['name'] for scenario in data['scenarios']]
+        paths = np.array([scenario['path'] for scenario in data['scenarios']], dtype='float64')
+        if paths.ndim != 2 or paths.shape[1] == 0 or not np.isfinite(paths).all():
+            raise ValueError("Scenario paths must be non-empty lists of numbers, all of the same length")
+        # All banks unless the request selects some, as for /process_batch
+        certs = resolve_batch_certs(data) if any(key in data for key in ('certs', 'rank_range', 'peer_group')) else None
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except (BotoCoreError, ClientError) as e:
+        logger.warning(f"Error loading institution details: {e}")
+        return jsonify({'error': f"Error loading institution details: {e}"}), 500
+    logger.debug(f"Received scenario request with {len(scenario_names)} {rate_field} paths of {paths.shape[1]} quarters")
+
+    with open('log.json', 'a') as log_file:
+        log_entry = {'certs': certs, 'model': model_type, 'result': f"{len(scenario_names)} scenarios; Rate: {rate_field}; Model: {model_type}"}
+        json.dump(log_entry, log_file)
+        log_file.write('\n')
+
+    try:
+        dataset = DATASET.get()
+        if rate_field not in dataset['columns']:
+            return jsonify({'error': f"Rate field not in dataset: {rate_field}"}), 400
+        results = get_model_results(dataset, model_type, rate_field)
+        all_certs = results['cert'].to_numpy()
+        if certs is None:
+            positions = np.arange(len(all_certs))
+            missing_certs = []
+        else:
+            positions, found = find_certs(all_certs, certs)
+            missing_certs = [cert for cert, is_found in zip(certs, found) if not is_found]
+            positions = positions[found]
+        projection = project_scenarios(dataset, results, model_type, paths, rate_field, positions)
+    except Exception as e:
+        logger.debug(f"Error projecting scenarios: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    def banks():
+        for i, cert in enumerate(all_certs[positions].tolist()):
+            yield {
+                'cert': cert,
+                # Rates to a hundredth of a basis point; expense (in thousands) to the dollar
+                'deposit_expense_rate': to_json_values(projection['deposit_expense_rate'][i], 6),
+                'annualized_EDEPDOM': to_json_values(projection['annualized_EDEPDOM'][i], 3),
+            }
+
+    if data.get('stream'):
+        # One line per bank, then a trailing record with the certs that were not found
+        lines = itertools.chain(banks(), [{'missing_certs': missing_certs}])
+        return Response((json.dumps(line) + '\n' for line in lines), mimetype='application/x-ndjson')
+    return jsonify({
+        'model_type': MODEL_TYPES[model_type],
+        'rate_field': rate_field,
+        'dataset_version': dataset['version'],
+        'scenarios': scenario_names,
+        'horizon': paths.shape[1],
+        'banks': list(banks()),
+        'missing_certs': missing_certs,
+    })
+
 @app.route('/logs', methods=['GET'])
 def get_logs():
     try:
@@ -121,7 +287,13 @@ def get_logs():
 # Prometheus metrics endpoint
 @app.route('/metrics')
 def metrics():
+    # Under gunicorn each worker counts separately; combine them when multiprocess mode is enabled
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
     return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
 
 if __name__ == '__main__':
+    # Development server; production runs gunicorn with gunicorn.conf.py
     app.run(host='0.0.0.0', port=8000)
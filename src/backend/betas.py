@@ -0,0 +1,163 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Model types accepted by the API -> name reported in the results
+MODEL_TYPES = {
+    'linear regression': 'Linear Regression',
+    'error correction': 'Error Correction',
+}
+
+# Rate series from FRED in the modeling table that models can be fitted on
+RATE_FIELDS = ['ff_t', 'ff_e', 't_1m', 't_3m', 't_6m', 't_12m', 't_2y', 't_3y', 't_5y', 't_7y', 't_10y', 't_30y']
+
+# Fewest observations a bank needs for its fit to be reported: one more than the model's regressors
+MIN_OBSERVATIONS = {
+    'linear regression': 2,
+    'error correction': 3,
+}
+
+# Fitted results for the current dataset version, keyed by (version, model type, rate field)
+_results_cache = {}
+
+def fit_grouped_ols(codes, X, y, n_groups):
+    """
+    Fit y = intercept + X @ coefficients separately for every group in one pass.
+
+    Each group's data is centered on its means and its normal equations are accumulated with bincount, so the cost
+    is linear in the number of rows whatever the number of groups. Like sklearn's LinearRegression, a regressor with
+    no variation within a group gets a coefficient of 0.
+
+    Args:
+    codes (np.ndarray): Group number of each row, from 0 to n_groups - 1.
+    X (np.ndarray): Regressors, one row per observation and one column per regressor.
+    y (np.ndarray): Dependent variable.
+    n_groups (int): Number of groups.
+
+    Returns:
+    tuple: (intercepts, coefficients with one row per group, number of observations per group). Groups without
+    observations get NaN intercepts and coefficients.
+    """
+    k = X.shape[1]
+    observations = np.bincount(codes, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_means = np.column_stack([np.bincount(codes, X[:, i], minlength=n_groups) for i in range(k)]) / observations[:, None]
+        y_means = np.bincount(codes, y, minlength=n_groups) / observations
+    X_centered = X - x_means[codes]
+    y_centered = y - y_means[codes]
+
+    xtx = np.empty((n_groups, k, k))
+    xty = np.empty((n_groups, k))
+    for i in range(k):
+        xty[:, i] = np.bincount(codes, X_centered[:, i] * y_centered, minlength=n_groups)
+        for j in range(i, k):
+            xtx[:, i, j] = xtx[:, j, i] = np.bincount(codes, X_centered[:, i] * X_centered[:, j], minlength=n_groups)
+
+    coefficients = np.full((n_groups, k), np.nan)
+    fitted = observations > 0
+    coefficients[fitted] = (np.linalg.pinv(xtx[fitted]) @ xty[fitted][:, :, None])[:, :, 0]
+    intercepts = y_means - np.einsum('gk,gk->g', x_means, coefficients)
+    return intercepts, coefficients, observations
+
+def fit_all_banks(dataset, model_type, rate_field='ff_t'):
+    """
+    Fit a deposit beta model for every cert in the dataset at once.
+
+    'linear regression' regresses deposit_expense_rate on the rate (ff_t by default). 'error correction' is a
+    two-step Engle-Granger model: the same long-run regression, then the quarterly change in deposit_expense_rate
+    regressed on the previous quarter's deviation from the long-run relationship and the change in the rate. Quarters
+    where either series is missing are left out.
+
+    Args:
+    dataset (dict): Dataset returned by dataset.load_dataset.
+    model_type (str): One of MODEL_TYPES.
+    rate_field (str): Rate series to regress on, e.g. 'ff_t' or 't_10y'.
+
+    Returns:
+    pd.DataFrame: One row per cert, in the dataset's cert order, with the number of observations, intercept and
+    coefficient, plus short_run_intercept, adjustment_speed and short_run_coefficient for the error correction model.
+    """
+    columns = dataset['columns']
+    if 'deposit_expense_rate' not in columns or rate_field not in columns:
+        raise KeyError('Necessary columns not found in data')
+
+    certs = np.asarray(dataset['certs'])
+    codes = np.repeat(np.arange(len(certs)), np.diff(dataset['offsets']))
+    x = np.asarray(columns[rate_field], dtype='float64')
+    y = np.asarray(columns['deposit_expense_rate'], dtype='float64')
+    valid = np.isfinite(x) & np.isfinite(y)
+
+    intercepts, coefficients, observations = fit_grouped_ols(codes[valid], x[valid, None], y[valid], len(certs))
+    results = pd.DataFrame({'cert': certs, 'observations': observations, 'intercept': intercepts, 'coefficient': coefficients[:, 0]})
+
+    if model_type == 'error correction':
+        # Rows are sorted by cert and date, so each row's predecessor is the same bank's previous quarter
+        deviation = y - intercepts[codes] - coefficients[codes, 0] * x
+        same_bank = (codes[1:] == codes[:-1]) & valid[1:] & valid[:-1]
+        short_run_X = np.column_stack([deviation[:-1], np.diff(x)])[same_bank]
+        short_run_intercepts, short_run, short_run_observations = fit_grouped_ols(codes[1:][same_bank], short_run_X, np.diff(y)[same_bank], len(certs))
+        results['short_run_intercept'] = short_run_intercepts
+        results['adjustment_speed'] = short_run[:, 0]
+        results['short_run_coefficient'] = short_run[:, 1]
+        results['observations'] = short_run_observations
+
+    return results
+
+def get_model_results(dataset, model_type, rate_field='ff_t'):
+    """
+    Return the fitted results of every cert for the dataset version, fitting them on first use.
+    """
+    key = (dataset['version'], model_type, rate_field)
+    if key not in _results_cache:
+        # Drop results for older dataset versions
+        for old_key in [old_key for old_key in _results_cache if old_key[0] != dataset['version']]:
+            del _results_cache[old_key]
+        _results_cache[key] = fit_all_banks(dataset, model_type, rate_field)
+    return _results_cache[key]
+
+def find_certs(known_certs, certs):
+    """
+    Find certs in a sorted array of certs.
+
+    Args:
+    known_certs (np.ndarray): Sorted certs, e.g. the cert column of get_model_results.
+    certs (list): Certs to look up.
+
+    Returns:
+    tuple: (positions in known_certs, whether each cert was found). Positions of certs that were not found are
+    meaningless.
+    """
+    certs = np.asarray(certs, dtype='int64')
+    if len(known_certs) == 0:
+        return np.zeros(len(certs), dtype='int64'), np.zeros(len(certs), dtype=bool)
+    positions = np.minimum(np.searchsorted(known_certs, certs), len(known_certs) - 1)
+    return positions, known_certs[positions] == certs
+
+def select_results(results, certs, model_type):
+    """
+    Look up the fitted results of the requested certs.
+
+    Args:
+    results (pd.DataFrame): Results returned by get_model_results.
+    certs (list): Certs to look up, in the order to return them.
+    model_type (str): One of MODEL_TYPES.
+
+    Returns:
+    list: One JSON-serializable dict per cert, with an 'error' entry for certs that are not in the dataset or have
+    too few observations to fit.
+    """
+    known_certs = results['cert'].to_numpy()
+    positions, found = find_certs(known_certs, certs)
+    records = results.iloc[positions].to_dict('records') if len(known_certs) else [{}] * len(certs)
+
+    selected = []
+    for cert, record, is_found in zip(certs, records, found):
+        if not is_found:
+            selected.append({'cert': int(cert), 'error': 'Cert not found in data'})
+            continue
+        record = {key: (None if isinstance(value, float) and math.isnan(value) else value) for key, value in record.items()}
+        record.update(cert=int(cert), observations=int(record['observations']), model_type=MODEL_TYPES[model_type])
+        if record['observations'] < MIN_OBSERVATIONS[model_type]:
+            record['error'] = 'Not enough observations to fit the model'
+        selected.append(record)
+    return selected
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the columnar copies of the modeling table, one subdirectory per version
+DATASET_PATH = os.getenv('DATASET_PATH', '/app/dataset')
+
+# Reserved cert for rows whose cert is not a number, such as Aggregated_Small_Banks
+AGGREGATED_CERT = -1
+
+def build_dataset(csv_path, dataset_path, version):
+    """
+    Convert the modeling table CSV file into a columnar copy, one .npy file per column, sorted by cert and date.
+
+    The copy is written to a new version directory and then made current by atomically replacing the CURRENT file,
+    so workers never see a partially written version.
+
+    Args:
+    csv_path (str): Path to the modeling table CSV file.
+    dataset_path (str): Directory holding the dataset versions.
+    version (str): Version identifier, e.g. the S3 ETag of the CSV file.
+    """
+    df = pd.read_csv(csv_path, low_memory=False)
+    df['cert'] = pd.to_numeric(df['cert'], errors='coerce').fillna(AGGREGATED_CERT).astype('int64')
+    if 'date' in df.columns:
+        # Streamed modeling tables store dates as YYYYMMDD integers, in-memory builds as ISO strings
+        df['date'] = pd.to_datetime(df['date'].astype(str), format='mixed')
+    df = df.sort_values(['cert', 'date'] if 'date' in df.columns else ['cert'], kind='stable').reset_index(drop=True)
+
+    version_path = os.path.join(dataset_path, version)
+    tmp_path = tempfile.mkdtemp(prefix=f'.{version}.', dir=dataset_path)
+    columns = []
+    for column in df.columns:
+        if column == 'date':
+            values = df[column].to_numpy(dtype='datetime64[ns]')
+        elif column == 'cert':
+            values = df[column].to_numpy()
+        else:
+            values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float64')
+        np.save(os.path.join(tmp_path, f'{len(columns)}.npy'), values)
+        columns.append(column)
+
+    # Row range of each cert, for lookups without scanning the cert column
+    certs, starts = np.unique(df['cert'].to_numpy(), return_index=True)
+    np.save(os.path.join(tmp_path, 'certs.npy'), certs)
+    np.save(os.path.join(tmp_path, 'offsets.npy'), np.append(starts, len(df)))
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump({'version': version, 'columns': columns, 'rows': len(df)}, f)
+
+    if os.path.isdir(version_path):
+        shutil.rmtree(version_path)
+    os.rename(tmp_path, version_path)
+    set_current_version(dataset_path, version)
+
+def get_current_version(dataset_path):
+    """
+    Return the current dataset version, or None if no dataset has been built.
+    """
+    try:
+        with open(os.path.join(dataset_path, 'CURRENT')) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def set_current_version(dataset_path, version):
+    """
+    Make a dataset version current and remove the versions before the previous one.
+
+    The previous version is kept for workers that are still loading it; workers still mapping an older version keep
+    working, as mapped files stay readable until they are unmapped.
+    """
+    previous_version = get_current_version(dataset_path)
+    current_tmp_path = os.path.join(dataset_path, '.CURRENT.tmp')
+    with open(current_tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(current_tmp_path, os.path.join(dataset_path, 'CURRENT'))
+
+    for name in os.listdir(dataset_path):
+        if name not in (version, previous_version, 'CURRENT', 'build.lock') and not name.startswith('.'):
+            shutil.rmtree(os.path.join(dataset_path, name), ignore_errors=True)
+
+def load_dataset(dataset_path):
+    """
+    Memory-map the current dataset version.
+
+    Args:
+    dataset_path (str): Directory holding the dataset versions.
+
+    Returns:
+    dict: 'version', 'rows', 'columns' (column name -> read-only array), 'certs' and 'offsets'.
+    """
+    version = get_current_version(dataset_path)
+    if version is None:
+        raise FileNotFoundError(f"No dataset has been built in {dataset_path}")
+
+    version_path = os.path.join(dataset_path, version)
+    with open(os.path.join(version_path, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    def load(name):
+        return np.load(os.path.join(version_path, f'{name}.npy'), mmap_mode='r')
+
+    return {
+        'version': version,
+        'rows': manifest['rows'],
+        'columns': {column: load(i) for i, column in enumerate(manifest['columns'])},
+        'certs': load('certs'),
+        'offsets': load('offsets'),
+    }
+
+def get_bank_rows(dataset, cert):
+    """
+    Return one bank's rows, in date order, as a DataFrame over the mapped arrays.
+
+    Args:
+    dataset (dict): Dataset returned by load_dataset.
+    cert (int): The bank's cert.
+
+    Returns:
+    pd.DataFrame: The bank's rows; empty if the cert is not in the dataset.
+    """
+    position = np.searchsorted(dataset['certs'], cert)
+    if position == len(dataset['certs']) or dataset['certs'][position] != cert:
+        start = end = 0
+    else:
+        start, end = dataset['offsets'][position], dataset['offsets'][position + 1]
+    return pd.DataFrame({column: values[start:end] for column, values in dataset['columns'].items()}, copy=False)
+
+def file_version(file_path):
+    """
+    Return a version identifier for a local file: the SHA-256 of its content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def ensure_dataset(dataset_path, version, fetch_csv):
+    """
+    Build the dataset version if it is not current yet, holding a file lock so only one worker builds it.
+
+    Args:
+    dataset_path (str): Directory holding the dataset versions.
+    version (str): Version that should be current.
+    fetch_csv (callable): Function taking a destination path and writing the modeling table CSV file there.
+
+    Returns:
+    bool: True if this call built the version.
+    """
+    if get_current_version(dataset_path) == version:
+        return False
+
+    os.makedirs(dataset_path, exist_ok=True)
+    with open(os.path.join(dataset_path, 'build.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            # Another worker may have built it while we waited for the lock
+            if get_current_version(dataset_path) == version:
+                return False
+            start_time = time.time()
+            csv_path = os.path.join(dataset_path, '.source.csv')
+            fetch_csv(csv_path)
+            build_dataset(csv_path, dataset_path, version)
+            os.remove(csv_path)
+            logger.info(f"Built dataset version {version} in {time.time() - start_time:.2f}s")
+            return True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class SharedDataset:
+    """
+    Per-process handle on the shared dataset.
+
+    Checks for a new upstream version at most every `refresh_seconds`, and re-maps the dataset when the current
+    version changes, whichever worker built it. If the check fails once a dataset is loaded, the loaded version keeps
+    being served until the next check.
+    """
+
+    def __init__(self, dataset_path, get_version, fetch_csv, refresh_seconds=300):
+        self.dataset_path = dataset_path
+        self.get_version = get_version
+        self.fetch_csv = fetch_csv
+        self.refresh_seconds = refresh_seconds
+        self.dataset = None
+        self.checked_at = 0.0
+
+    def get(self):
+        """
+        Return the mapped dataset, refreshing it first if it may be out of date.
+        """
+        if self.dataset is None or time.time() - self.checked_at > self.refresh_seconds:
+            try:
+                ensure_dataset(self.dataset_path, self.get_version(), self.fetch_csv)
+            except Exception:
+                # Without a loaded dataset there is nothing to fall back on
+                if self.dataset is None:
+                    raise
+                logger.exception(f"Dataset refresh failed; serving version {self.dataset['version']}")
+            self.checked_at = time.time()
+
+        if self.dataset is None or get_current_version(self.dataset_path) != self.dataset['version']:
+            self.dataset = load_dataset(self.dataset_path)
+        return self.dataset
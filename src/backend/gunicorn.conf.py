@@ -0,0 +1,34 @@
+# gunicorn settings for serving the backend with several worker processes:
+#   gunicorn -c gunicorn.conf.py app:app
+import os
+import shutil
+import logging
+
+bind = '0.0.0.0:8000'
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+# The first request after a new modeling table is published waits for the dataset build
+timeout = 120
+
+def on_starting(server):
+    """
+    Build the shared dataset once, before the workers start, and reset the Prometheus multiprocess directory.
+    """
+    multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+    from app import DATASET
+    try:
+        DATASET.get()
+    except Exception as e:
+        # Workers retry on their first request
+        logging.getLogger(__name__).warning(f"Could not build the dataset at startup: {e}")
+
+def child_exit(server, worker):
+    """
+    Drop the exited worker's live Prometheus metrics.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
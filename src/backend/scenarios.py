@@ -0,0 +1,128 @@
+import numpy as np
+from betas import MIN_OBSERVATIONS
+
+def get_latest_values(dataset, rate_field='ff_t'):
+    """
+    Return each bank's values in its latest quarter with both deposit_expense_rate and the rate, the starting point of
+    its projections.
+
+    Args:
+    dataset (dict): Dataset returned by dataset.load_dataset.
+    rate_field (str): Rate series the projections are driven by.
+
+    Returns:
+    dict: Arrays in the dataset's cert order: 'rate', 'deposit_expense_rate' and 'DEPDOM' (NaN for banks without a
+    complete quarter, and for DEPDOM if the dataset does not have it).
+    """
+    columns = dataset['columns']
+    offsets = np.asarray(dataset['offsets'])
+    x = np.asarray(columns[rate_field], dtype='float64')
+    y = np.asarray(columns['deposit_expense_rate'], dtype='float64')
+
+    # Rows are sorted by cert and date, so the latest complete quarter is the bank's largest valid row number
+    row_numbers = np.where(np.isfinite(x) & np.isfinite(y), np.arange(len(x)), -1)
+    latest_rows = np.maximum.reduceat(row_numbers, offsets[:-1]) if len(row_numbers) else np.empty(0, dtype='int64')
+    found = latest_rows >= 0
+
+    def take(values):
+        latest = np.full(len(latest_rows), np.nan)
+        latest[found] = np.asarray(values, dtype='float64')[latest_rows[found]]
+        return latest
+
+    return {
+        'rate': take(x),
+        'deposit_expense_rate': take(y),
+        'DEPDOM': take(columns['DEPDOM']) if 'DEPDOM' in columns else np.full(len(latest_rows), np.nan),
+    }
+
+def project_linear(results, paths):
+    """
+    Project deposit_expense_rate with the linear model, for every bank under every rate path.
+
+    Args:
+    results (pd.DataFrame): Linear regression results returned by betas.get_model_results.
+    paths (np.ndarray): Rate paths, one row per scenario and one column per quarter ahead.
+
+    Returns:
+    np.ndarray: Projected rates indexed by bank, scenario and quarter ahead.
+    """
+    intercepts = results['intercept'].to_numpy()[:, None, None]
+    coefficients = results['coefficient'].to_numpy()[:, None, None]
+    return intercepts + coefficients * paths[None, :, :]
+
+def project_error_correction(results, latest, paths):
+    """
+    Project deposit_expense_rate with the error correction model, for every bank under every rate path.
+
+    Each quarter moves every bank's rate by its short-run response to the change in the rate path, plus a pull back
+    towards its long-run relationship with the rate. The recursion runs over quarters ahead, with all banks and
+    scenarios updated together.
+
+    Args:
+    results (pd.DataFrame): Error correction results returned by betas.get_model_results.
+    latest (dict): Starting values returned by get_latest_values.
+    paths (np.ndarray): Rate paths, one row per scenario and one column per quarter ahead.
+
+    Returns:
+    np.ndarray: Projected rates indexed by bank, scenario and quarter ahead.
+    """
+    def column(name):
+        return results[name].to_numpy()[:, None]
+
+    intercepts, coefficients = column('intercept'), column('coefficient')
+    short_run_intercepts, adjustment_speeds, short_run_coefficients = column('short_run_intercept'), column('adjustment_speed'), column('short_run_coefficient')
+
+    n_scenarios, horizon = paths.shape
+    projected = np.empty((len(results), n_scenarios, horizon))
+    rate = np.repeat(latest['deposit_expense_rate'][:, None], n_scenarios, axis=1)
+    previous_path = latest['rate'][:, None]
+    for quarter in range(horizon):
+        path = paths[None, :, quarter]
+        deviation = rate - intercepts - coefficients * previous_path
+        rate = rate + short_run_intercepts + adjustment_speeds * deviation + short_run_coefficients * (path - previous_path)
+        projected[:, :, quarter] = rate
+        previous_path = path
+    return projected
+
+def project_scenarios(dataset, results, model_type, paths, rate_field='ff_t', positions=None):
+    """
+    Project deposit_expense_rate and deposit interest expense (annualized_EDEPDOM) for every bank under every path.
+
+    Interest expense is the projected rate times the bank's latest domestic deposits (DEPDOM), held flat. Banks with
+    too few observations to fit get NaN projections.
+
+    Args:
+    dataset (dict): Dataset returned by dataset.load_dataset.
+    results (pd.DataFrame): Results of model_type returned by betas.get_model_results, fitted on rate_field.
+    model_type (str): One of betas.MODEL_TYPES.
+    paths (np.ndarray): Rate paths, one row per scenario and one column per quarter ahead.
+    rate_field (str): Rate series the paths are for.
+    positions (np.ndarray): Positions of the banks to project in the dataset's cert order; defaults to all banks.
+
+    Returns:
+    dict: 'deposit_expense_rate' and 'annualized_EDEPDOM' arrays indexed by bank (in the order of `positions`),
+    scenario and quarter ahead.
+    """
+    paths = np.asarray(paths, dtype='float64')
+    latest = get_latest_values(dataset, rate_field)
+    if positions is not None:
+        results = results.iloc[positions]
+        latest = {name: values[positions] for name, values in latest.items()}
+    if model_type == 'error correction':
+        projected = project_error_correction(results, latest, paths)
+    else:
+        projected = project_linear(results, paths)
+    projected[results['observations'].to_numpy() < MIN_OBSERVATIONS[model_type]] = np.nan
+    return {
+        'deposit_expense_rate': projected,
+        'annualized_EDEPDOM': projected * latest['DEPDOM'][:, None, None],
+    }
+
+def to_json_values(array, decimals):
+    """
+    Convert an array to nested lists for JSON, with NaN as None.
+
+    Rounding keeps large responses quick to serialize; most of their time goes into formatting floats.
+    """
+    array = np.round(array, decimals)
+    return np.where(np.isnan(array), None, array).tolist()
@@ -1,15 +1,64 @@
 import os
+import argparse
+import numpy as np
 import pandas as pd
-import time
+
+from derived_metrics import MODELING_TABLE_METRICS, compute_derived_metrics, evaluate_metric
+from rate_panel import prepare_rate_panel
+from instrumentation import ProgressTracker, finish_run, stage, start_run
 
 FDIC_DATA_PATH = './data/raw/fdic'
 FRED_DATA_PATH = './data/raw/rates/fred_data.csv'
 BEST_RANKS_PATH = './data/processed/institution_details.csv'
 OUTPUT_PATH_TEMPLATE = './data/processed/bank_data_rank{}.csv'
 
-def process_fdic_data(fdic_data_path, annualize_fields, non_annualize_fields, start_year):
+# Reserved cert for the Aggregated_Small_Banks row in compact (streaming) outputs, where cert is an integer column
+AGGREGATED_CERT = -1
+
+# Asset size tiers for bucketing small banks, by total assets (ASSET, in thousands of dollars) in each quarter
+ASSET_TIER_BOUNDS = [100_000, 1_000_000, 10_000_000]
+ASSET_TIER_LABELS = ['under_100m', '100m_to_1b', '1b_to_10b', 'over_10b']
+
+# State and territory codes (FDIC STALP) for bucketing small banks by state; other values go to 'unknown'
+STATE_LABELS = sorted([
+    'AK', 'AL', 'AR', 'AS', 'AZ', 'CA', 'CO', 'CT', 'DC', 'DE', 'FL', 'FM', 'GA', 'GU', 'HI', 'IA', 'ID', 'IL', 'IN',
+    'KS', 'KY', 'LA', 'MA', 'MD', 'ME', 'MH', 'MI', 'MN', 'MO', 'MP', 'MS', 'MT', 'NC', 'ND', 'NE', 'NH', 'NJ', 'NM',
+    'NV', 'NY', 'OH', 'OK', 'OR', 'PA', 'PR', 'PW', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VA', 'VI', 'VT', 'WA', 'WI',
+    'WV', 'WY',
+]) + ['unknown']
+
+# Reserved cert of the first bucket aggregate; bucket i of the fixed labels above gets BUCKET_CERT_BASE - i, so the
+# certs are the same across data vintages and never collide with AGGREGATED_CERT
+BUCKET_CERT_BASE = -100
+
+def read_fdic_quarter(file_path, annualize_fields, non_annualize_fields):
     """
-    Process FDIC CSV files to aggregate specified fields.
+    Read one long-format FDIC quarter file and sum the specified fields for each cert.
+    
+    Args:
+    file_path (str): Path to the FDIC quarter CSV file.
+    annualize_fields (list): List of fields that need to be annualized (returned as raw_{field}).
+    non_annualize_fields (list): List of fields that don't need annualization.
+    
+    Returns:
+    pd.DataFrame: DataFrame indexed by int32 cert, in file order, with one float64 column per field; missing fields are 0.
+    """
+    fields = annualize_fields + non_annualize_fields
+    df = pd.read_csv(file_path, usecols=['Cert', 'Field', 'Value'], dtype={'Cert': 'int32', 'Field': 'category'})
+    certs = df['Cert'].unique()
+
+    df = df[df['Field'].isin(fields)]
+    values = pd.to_numeric(df['Value'], errors='coerce').astype('float64')
+    quarter_df = values.groupby([df['Cert'], df['Field'].astype(str)], sort=False).sum().unstack('Field')
+    quarter_df = quarter_df.reindex(index=certs, columns=fields).fillna(0.0)
+
+    quarter_df.index.name = 'cert'
+    quarter_df.columns.name = None
+    return quarter_df.rename(columns={field: f'raw_{field}' for field in annualize_fields})
+
+def iter_fdic_quarters(fdic_data_path, annualize_fields, non_annualize_fields, start_year):
+    """
+    Yield the FDIC quarter files one at a time, in chronological order.
     
     Args:
     fdic_data_path (str): Path to the directory containing FDIC data CSV files.
@@ -17,44 +66,45 @@ def process_fdic_data(fdic_data_path, annualize_fields, non_annualize_fields, st
     non_annualize_fields (list): List of fields that don't need annualization.
     start_year (int): The starting year to process files from.
     
-    Returns:
-    pd.DataFrame: DataFrame with date, cert, and specified fields.
+    Yields:
+    tuple: (date string in YYYYMMDD format, DataFrame returned by read_fdic_quarter).
     """
-    records = []
-
     files = [f for f in os.listdir(fdic_data_path) if f.endswith('.csv') and int(f[:4]) >= start_year]
     files.sort()  # Ensure files are processed in chronological order
-    total_files = len(files)
-    start_time = time.time()
+    progress = ProgressTracker('Processing FDIC files', len(files))
 
     for i, file_name in enumerate(files, start=1):
-        if i < 6 or i % 15 == 0 or i == total_files:
-            elapsed_time = time.time() - start_time
-            average_time_per_file = elapsed_time / i
-            remaining_files = total_files - i
-            estimated_time_remaining = average_time_per_file * remaining_files
-            print(f"Processing file {i} out of {total_files}; elapsed time: {elapsed_time:.2f}s; expected time remaining: {estimated_time_remaining:.2f}s")
-
         file_path = os.path.join(fdic_data_path, file_name)
-        df = pd.read_csv(file_path)
         date = file_name.split('.')[0]
+        with stage('read_fdic_quarter') as record:
+            quarter_df = read_fdic_quarter(file_path, annualize_fields, non_annualize_fields)
+            record['rows'] = len(quarter_df)
+        progress.update(i, len(quarter_df))
+        yield date, quarter_df
 
-        for cert in df['Cert'].unique():
-            cert_data = df[df['Cert'] == cert]
-            record = {'date': date, 'cert': cert}
-
-            for field in annualize_fields + non_annualize_fields:
-                if field in annualize_fields:
-                    value = cert_data.loc[cert_data['Field'] == field, 'Value'].sum()
-                    record[f'raw_{field}'] = value
-                else:
-                    value = cert_data.loc[cert_data['Field'] == field, 'Value'].sum()
-                    record[field] = value
-
-            records.append(record)
+def process_fdic_data(fdic_data_path, annualize_fields, non_annualize_fields, start_year):
+    """
+    Process FDIC CSV files to aggregate specified fields.
+    
+    Args:
+    fdic_data_path (str): Path to the directory containing FDIC data CSV files.
+    annualize_fields (list): List of fields that need to be annualized.
+    non_annualize_fields (list): List of fields that don't need annualization.
+    start_year (int): The starting year to process files from.
+    
+    Returns:
+    pd.DataFrame: DataFrame with date, cert, and specified fields.
+    """
+    quarters = [
+        quarter_df.reset_index().astype({'cert': 'int64'}).assign(date=date)
+        for date, quarter_df in iter_fdic_quarters(fdic_data_path, annualize_fields, non_annualize_fields, start_year)
+    ]
+    if not quarters:
+        return pd.DataFrame()
 
-    fdic_aggregated_df = pd.DataFrame(records)
-    return fdic_aggregated_df
+    fdic_aggregated_df = pd.concat(quarters, ignore_index=True)
+    columns = ['date', 'cert'] + [column for column in fdic_aggregated_df.columns if column not in ('date', 'cert')]
+    return fdic_aggregated_df[columns]
 
 def annualize_ytd_fields(df, annualize_fields):
     """
@@ -67,30 +117,57 @@ def annualize_ytd_fields(df, annualize_fields):
     Returns:
     pd.DataFrame: DataFrame with additional columns for the annualized fields.
     """
+    # Previous value of each cert's series, in date order; NaN for a cert's first quarter
+    ordered_df = df.sort_values(by='date', kind='stable')
+    is_march = pd.to_datetime(ordered_df['date']).dt.month.to_numpy() == 3
+    raw_columns = [f'raw_{field}' for field in annualize_fields]
+    previous_df = ordered_df.groupby('cert', sort=False)[raw_columns].shift(1)
+
     for field in annualize_fields:
         annualized_field_name = f'annualized_{field.split("_")[-1]}'
-        df[annualized_field_name] = None
-
-        # Group by cert to process each bank's data separately
-        for cert, group in df.groupby('cert'):
-            group = group.sort_values(by='date')
-            annualized_values = []
-            prev_value = None
-
-            for date, value in zip(group['date'], group[f'raw_{field}']):
-                if pd.to_datetime(date).month == 3:
-                    annualized_values.append(value * 4)
-                else:
-                    if prev_value is not None:
-                        annualized_values.append((value - prev_value) * 4)
-                    else:
-                        annualized_values.append(value * 4)  # Default case for the first quarter
-                prev_value = value
-
-            df.loc[group.index, annualized_field_name] = annualized_values
+        value = ordered_df[f'raw_{field}']
+        prev_value = previous_df[f'raw_{field}']
+
+        # March values are already one quarter; otherwise take the change since the prior quarter
+        annualized_values = (value - prev_value.where(~is_march & prev_value.notnull(), 0)) * 4
+        df[annualized_field_name] = annualized_values.reindex(df.index)
 
     return df
 
+def load_fred_data(fred_data_path, fred_fields):
+    """
+    Load the FRED data as daily rates in decimal form, forward filled and trimmed to 6 decimal places.
+    
+    The cleaned series are read from the rate panel cache next to the FRED data file, which is rebuilt only when
+    the file changes.
+    
+    Args:
+    fred_data_path (str): Path to the FRED data CSV file.
+    fred_fields (list): List of FRED fields to load.
+    
+    Returns:
+    pd.DataFrame: FRED data indexed by date.
+    """
+    return prepare_rate_panel(fred_data_path)['daily'][fred_fields]
+
+def attach_fred_data(fdic_df, fred_df, fred_fields):
+    """
+    Attach the latest FRED values on or before each FDIC report date.
+    
+    Args:
+    fdic_df (pd.DataFrame): DataFrame with FDIC aggregated data and a YYYYMMDD date column.
+    fred_df (pd.DataFrame): FRED data returned by load_fred_data.
+    fred_fields (list): List of FRED fields to merge.
+    
+    Returns:
+    pd.DataFrame: Merged DataFrame, sorted by date.
+    """
+    # Convert FDIC date to datetime
+    fdic_df['date'] = pd.to_datetime(fdic_df['date'], format='%Y%m%d')
+
+    # Merge the data, forward filling missing ff_e values
+    return pd.merge_asof(fdic_df.sort_values('date'), fred_df[fred_fields].sort_index(), left_on='date', right_index=True, direction='backward')
+
 def merge_with_fred_data(fdic_df, fred_data_path, fred_fields):
     """
     Merge FDIC aggregated data with FRED data.
@@ -103,89 +180,426 @@ def merge_with_fred_data(fdic_df, fred_data_path, fred_fields):
     Returns:
     pd.DataFrame: Merged DataFrame.
     """
-    # Read the FRED data without specifying column names
-    fred_df = pd.read_csv(fred_data_path)
+    return attach_fred_data(fdic_df, load_fred_data(fred_data_path, fred_fields), fred_fields)
 
-    # Rename the first column to 'date'
-    fred_df.rename(columns={fred_df.columns[0]: 'date'}, inplace=True)
+def calculate_percentage(df, numerator, denominator, new_column):
+    values = evaluate_metric(df, {'name': new_column, 'numerator': numerator, 'denominator': denominator})
+    if values is not None:
+        df[new_column] = values
 
-    # Set 'date' as index and parse dates
-    fred_df['date'] = pd.to_datetime(fred_df['date'])
-    fred_df.set_index('date', inplace=True)
+def process_and_merge_data(fdic_data_path, fred_data_path, best_ranks_path, output_path_template, annualize_fields, non_annualize_fields, fred_fields, rank_threshold, start_year):
+    # Process FDIC data
+    with stage('process_fdic_data') as record:
+        fdic_df = process_fdic_data(fdic_data_path, annualize_fields, non_annualize_fields, start_year)
+        record['rows'] = len(fdic_df)
 
-    # Divide values by 100
-    fred_df[fred_fields] = fred_df[fred_fields] / 100
+    with stage('aggregate_small_banks') as record:
+        # Load best asset ranks
+        best_ranks_df = pd.read_csv(best_ranks_path)
+        
+        # Filter institutions based on rank threshold
+        high_rank_certs = best_ranks_df[best_ranks_df['Best_Asset_Rank'] <= rank_threshold]['Cert'].tolist()
+        
+        # Separate high rank and low rank data
+        high_rank_df = fdic_df[fdic_df['cert'].isin(high_rank_certs)]
+        low_rank_df = fdic_df[~fdic_df['cert'].isin(high_rank_certs)]
+        
+        # Aggregate low rank data; cert is an identifier, so it is not summed
+        low_rank_aggregated_df = low_rank_df.drop(columns='cert').groupby('date').sum().reset_index()
+        low_rank_aggregated_df['cert'] = 'Aggregated_Small_Banks'
+        
+        # Combine high rank and low rank data
+        combined_df = pd.concat([high_rank_df, low_rank_aggregated_df], ignore_index=True)
+        record['rows'] = len(fdic_df)
+    
+    # Annualize the specified fields
+    with stage('annualize_ytd_fields', rows=len(combined_df)):
+        combined_df = annualize_ytd_fields(combined_df, annualize_fields)
+    
+    # Calculate additional fields
+    with stage('compute_derived_metrics', rows=len(combined_df)):
+        combined_df = compute_derived_metrics(combined_df, MODELING_TABLE_METRICS)
 
-    # Forward fill each FRED field separately
-    for field in fred_fields:
-        fred_df[field] = fred_df[field].ffill()
+    # Merge with FRED data
+    with stage('merge_with_fred_data', rows=len(combined_df)):
+        merged_df = merge_with_fred_data(combined_df, fred_data_path, fred_fields)
+    
+    with stage('write_output', rows=len(merged_df)):
+        # Sort by cert and date
+        merged_df = merged_df.sort_values(by=['cert', 'date'])
 
-    # Trim precision to 6 decimal places
-    for field in fred_fields:
-        fred_df[field] = fred_df[field].round(6)
+        # Save the merged data to CSV
+        output_path = output_path_template.format(rank_threshold)
+        merged_df.to_csv(output_path, index=False)
+    print(f"Merged data saved to {output_path}")
 
-    # Convert FDIC date to datetime
-    fdic_df['date'] = pd.to_datetime(fdic_df['date'], format='%Y%m%d')
+def aggregate_small_banks_by_threshold(fdic_df, cert_ranks, rank_thresholds):
+    """
+    Sum the banks below each rank threshold per date in a single grouped pass.
+    
+    Each cert is assigned the number of thresholds it falls below; the per-(tier, date) sums are then accumulated
+    from the lowest ranked tier upwards, so the aggregate for a threshold covers every tier below it.
+    
+    Args:
+    fdic_df (pd.DataFrame): DataFrame returned by process_fdic_data.
+    cert_ranks (pd.Series): Best asset rank indexed by cert; certs without a rank count as small banks.
+    rank_thresholds (list): Rank thresholds to aggregate for.
+    
+    Returns:
+    dict: Rank threshold -> DataFrame with date, cert ('Aggregated_Small_Banks') and the summed fields.
+    """
+    thresholds = sorted(rank_thresholds)
+    value_columns = [column for column in fdic_df.columns if column not in ('date', 'cert')]
 
-    # Merge the data, forward filling missing ff_e values
-    merged_df = pd.merge_asof(fdic_df.sort_values('date'), fred_df[fred_fields].sort_index(), left_on='date', right_index=True, direction='backward')
+    ranks = fdic_df['cert'].map(cert_ranks).fillna(float('inf')).to_numpy()
+    tiers = pd.Series(np.searchsorted(thresholds, ranks, side='left'), index=fdic_df.index, name='tier')
 
-    return merged_df
+    low_rank_df = fdic_df[tiers > 0]
+    grouped = low_rank_df.groupby([tiers[tiers > 0], low_rank_df['date']])
+    sums = grouped[value_columns].sum()
+    counts = grouped.size()
 
-def calculate_percentage(df, numerator, denominator, new_column):
-    if numerator in df.columns and denominator in df.columns:
-        df[new_column] = df.apply(
-            lambda row: row[numerator] / row[denominator] if pd.notnull(row[numerator]) and pd.notnull(row[denominator]) and row[denominator] != 0 else None, axis=1
-        )
+    # Accumulate from the lowest ranked tier: threshold i aggregates tiers i + 1 and above
+    tier_index = pd.MultiIndex.from_product([range(len(thresholds), 0, -1), sorted(fdic_df['date'].unique())], names=['tier', 'date'])
+    sums = sums.reindex(tier_index, fill_value=0).groupby(level='date').cumsum()
+    counts = counts.reindex(tier_index, fill_value=0).groupby(level='date').cumsum()
 
-def process_and_merge_data(fdic_data_path, fred_data_path, best_ranks_path, output_path_template, annualize_fields, non_annualize_fields, fred_fields, rank_threshold, start_year):
-    # Process FDIC data
-    fdic_df = process_fdic_data(fdic_data_path, annualize_fields, non_annualize_fields, start_year)
+    aggregates = {}
+    for i, threshold in enumerate(thresholds):
+        tier_sums = sums.xs(i + 1, level='tier')[counts.xs(i + 1, level='tier') > 0]
+        aggregated_df = tier_sums.reset_index()
+        aggregated_df.insert(1, 'cert', 'Aggregated_Small_Banks')
+        aggregates[threshold] = aggregated_df
+    return aggregates
+
+def process_and_merge_data_for_thresholds(fdic_data_path, fred_data_path, best_ranks_path, output_path_template, annualize_fields, non_annualize_fields, fred_fields, rank_thresholds, start_year):
+    """
+    Build the modeling table for several rank thresholds from one pass over the raw FDIC files.
+    
+    The FDIC files are processed, and the large banks annualized, once; only the small bank aggregates are
+    built and annualized per threshold. Each output matches process_and_merge_data for that threshold.
+    
+    Args:
+    fdic_data_path (str): Path to the directory containing FDIC data CSV files.
+    fred_data_path (str): Path to the FRED data CSV file.
+    best_ranks_path (str): Path to the institution details CSV file with Best_Asset_Rank.
+    output_path_template (str): Output path with a placeholder for the rank threshold.
+    annualize_fields (list): List of fields that need to be annualized.
+    non_annualize_fields (list): List of fields that don't need annualization.
+    fred_fields (list): List of FRED fields to merge.
+    rank_thresholds (list): Rank thresholds to build tables for.
+    start_year (int): The starting year to process files from.
+    """
+    # Process FDIC and FRED data once
+    with stage('process_fdic_data') as record:
+        fdic_df = process_fdic_data(fdic_data_path, annualize_fields, non_annualize_fields, start_year)
+        record['rows'] = len(fdic_df)
+    with stage('load_fred_data'):
+        fred_df = load_fred_data(fred_data_path, fred_fields)
 
     # Load best asset ranks
     best_ranks_df = pd.read_csv(best_ranks_path)
+    cert_ranks = best_ranks_df.groupby('Cert')['Best_Asset_Rank'].min()
+
+    # Annualize every bank that is a high rank bank for at least one threshold
+    high_rank_certs = cert_ranks[cert_ranks <= max(rank_thresholds)].index
+    with stage('annualize_ytd_fields') as record:
+        high_rank_df = annualize_ytd_fields(fdic_df[fdic_df['cert'].isin(high_rank_certs)].copy(), annualize_fields)
+        record['rows'] = len(high_rank_df)
+
+    with stage('aggregate_small_banks', rows=len(fdic_df)):
+        aggregates = aggregate_small_banks_by_threshold(fdic_df, cert_ranks, rank_thresholds)
+
+    for rank_threshold in sorted(rank_thresholds):
+        with stage(f'rank{rank_threshold}') as record:
+            threshold_certs = cert_ranks[cert_ranks <= rank_threshold].index
+            low_rank_aggregated_df = annualize_ytd_fields(aggregates[rank_threshold], annualize_fields)
+
+            # Combine high rank and low rank data
+            combined_df = pd.concat([high_rank_df[high_rank_df['cert'].isin(threshold_certs)], low_rank_aggregated_df], ignore_index=True)
+
+            # Calculate additional fields
+            combined_df = compute_derived_metrics(combined_df, MODELING_TABLE_METRICS)
+
+            # Merge with FRED data
+            merged_df = attach_fred_data(combined_df, fred_df, fred_fields)
+
+            # Sort by cert and date
+            merged_df = merged_df.sort_values(by=['cert', 'date'])
+
+            # Save the merged data to CSV
+            output_path = output_path_template.format(rank_threshold)
+            merged_df.to_csv(output_path, index=False)
+            record['rows'] = len(merged_df)
+        print(f"Merged data saved to {output_path}")
+
+def assign_buckets(fdic_df, bucket_by, best_ranks_df):
+    """
+    Assign each row to a bucket: the bank's asset size tier in that quarter, or its state from a column of the
+    institution details.
     
-    # Filter institutions based on rank threshold
-    high_rank_certs = best_ranks_df[best_ranks_df['Best_Asset_Rank'] <= rank_threshold]['Cert'].tolist()
+    Args:
+    fdic_df (pd.DataFrame): DataFrame with cert and, for asset tiers, ASSET columns.
+    bucket_by (str): 'asset_tier', or the name of a column of best_ranks_df holding state codes.
+    best_ranks_df (pd.DataFrame): Institution details with a Cert column.
     
-    # Separate high rank and low rank data
-    high_rank_df = fdic_df[fdic_df['cert'].isin(high_rank_certs)]
-    low_rank_df = fdic_df[~fdic_df['cert'].isin(high_rank_certs)]
+    Returns:
+    pd.Series: Categorical bucket of each row, aligned with fdic_df, with ASSET_TIER_LABELS or STATE_LABELS as the
+    categories; certs without a state code in the details are 'unknown'.
+    """
+    if bucket_by == 'asset_tier':
+        codes = np.searchsorted(ASSET_TIER_BOUNDS, fdic_df['ASSET'].to_numpy(), side='right')
+        return pd.Series(pd.Categorical.from_codes(codes, ASSET_TIER_LABELS), index=fdic_df.index, name='bucket')
+
+    if bucket_by not in best_ranks_df.columns:
+        raise ValueError(f"Institution details have no {bucket_by} column to bucket by")
+    labels = best_ranks_df.drop_duplicates('Cert').set_index('Cert')[bucket_by].dropna().astype(str)
+    states = fdic_df['cert'].map(labels)
+    states = states.where(states.isin(STATE_LABELS), 'unknown')
+    return pd.Series(pd.Categorical(states, categories=STATE_LABELS), index=fdic_df.index, name='bucket')
+
+def aggregate_buckets(df, buckets, weighted_fields=None):
+    """
+    Aggregate banks per bucket and date in a single grouped pass.
     
-    # Aggregate low rank data
-    low_rank_aggregated_df = low_rank_df.groupby('date').sum().reset_index()
-    low_rank_aggregated_df['cert'] = 'Aggregated_Small_Banks'
+    Fields are summed, except the weighted fields, which are averaged with the given weights over the banks that
+    have a value. Each bucket gets its own reserved cert, BUCKET_CERT_BASE minus the position of the bucket in its
+    fixed list of labels.
     
-    # Combine high rank and low rank data
-    combined_df = pd.concat([high_rank_df, low_rank_aggregated_df], ignore_index=True)
+    Args:
+    df (pd.DataFrame): One row per bank and date, with date, cert and numeric field columns.
+    buckets (pd.Series): Categorical bucket of each row, aligned with df, as returned by assign_buckets.
+    weighted_fields (dict): Field -> weight field, for ratio fields to average rather than sum.
     
-    # Annualize the specified fields
-    combined_df = annualize_ytd_fields(combined_df, annualize_fields)
+    Returns:
+    pd.DataFrame: One row per bucket and date with date, int32 cert, the aggregated fields, the categorical bucket
+    and the int32 bank_count.
+    """
+    weighted_fields = weighted_fields or {}
+    sum_columns = [column for column in df.columns if column not in ('date', 'cert') and column not in weighted_fields]
+
+    # Sum weight x value and the weights of the banks with a value, then divide once per group
+    parts = [df[sum_columns]]
+    for field, weight_field in weighted_fields.items():
+        weights = df[weight_field].where(df[field].notna(), 0.0).fillna(0.0)
+        parts.append(pd.DataFrame({f'weighted_{field}': df[field].fillna(0.0) * weights, f'weight_{field}': weights}))
+    values_df = pd.concat(parts, axis=1)
+
+    grouped = values_df.groupby([buckets.rename('bucket'), df['date']], observed=True, sort=True)
+    aggregated_df = grouped.sum()
+    for field in weighted_fields:
+        weights = aggregated_df.pop(f'weight_{field}')
+        aggregated_df[field] = (aggregated_df.pop(f'weighted_{field}') / weights).where(weights > 0)
+    aggregated_df['bank_count'] = grouped.size().astype('int32')
+
+    aggregated_df = aggregated_df.reset_index()
+    aggregated_df.insert(1, 'cert', BUCKET_CERT_BASE - aggregated_df['bucket'].cat.codes.astype('int32'))
+    return aggregated_df[['date', 'cert'] + sum_columns + list(weighted_fields) + ['bucket', 'bank_count']]
+
+def process_and_merge_data_by_bucket(fdic_data_path, fred_data_path, best_ranks_path, output_path, annualize_fields, non_annualize_fields, fred_fields, rank_threshold, start_year, bucket_by, ratio_weight=None):
+    """
+    Build the modeling table with the small banks aggregated into one row per bucket and date instead of one per date.
     
-    # Calculate additional fields
-    calculate_percentage(combined_df, 'DEPINS', 'DEPDOM', 'insured_deposit_percentage')
-    calculate_percentage(combined_df, 'DEPNIDOM', 'DEPDOM', 'nib_deposit_percentage')
-    calculate_percentage(combined_df, 'BRO', 'DEPDOM', 'brokered_deposit_percentage')
-    calculate_percentage(combined_df, 'SC', 'ASSET', 'securities_asset_percentage')
-    calculate_percentage(combined_df, 'annualized_NONII', 'annualized_INCY', 'nonii_revenue_percentage')
-    calculate_percentage(combined_df, 'annualized_EDEPDOM', 'DEPDOM', 'deposit_expense_rate')
+    Every row is labelled with its bucket and the number of banks it covers, and small bank buckets get reserved
+    negative certs (see aggregate_buckets). Year-to-date fields are annualized for each bank before aggregating, as
+    banks move between asset tiers from one quarter to the next. By default the bucket ratios are computed from the
+    bucket totals, which weights each bank's ratio by its denominator. With ratio_weight, the ratios are computed
+    for each bank first and averaged with that field as the weight, e.g. ASSET for asset-weighted averages.
+    
+    Args:
+    fdic_data_path (str): Path to the directory containing FDIC data CSV files.
+    fred_data_path (str): Path to the FRED data CSV file.
+    best_ranks_path (str): Path to the institution details CSV file with Best_Asset_Rank.
+    output_path (str): Path to write the output CSV file to.
+    annualize_fields (list): List of fields that need to be annualized.
+    non_annualize_fields (list): List of fields that don't need annualization.
+    fred_fields (list): List of FRED fields to merge.
+    rank_threshold (int): Keep certs with a best rank at or above this; aggregate the rest per bucket.
+    start_year (int): The starting year to process files from.
+    bucket_by (str): 'asset_tier', or a column of the institution details holding state codes.
+    ratio_weight (str): Field to weight bank ratios by, or None to compute ratios from bucket totals.
+    """
+    with stage('process_fdic_data') as record:
+        fdic_df = process_fdic_data(fdic_data_path, annualize_fields, non_annualize_fields, start_year)
+        record['rows'] = len(fdic_df)
 
-    # Merge with FRED data
-    merged_df = merge_with_fred_data(combined_df, fred_data_path, fred_fields)
+    best_ranks_df = pd.read_csv(best_ranks_path)
+    high_rank_certs = best_ranks_df.loc[best_ranks_df['Best_Asset_Rank'] <= rank_threshold, 'Cert'].tolist()
+
+    with stage('annualize_ytd_fields', rows=len(fdic_df)):
+        fdic_df = annualize_ytd_fields(fdic_df, annualize_fields)
+
+    # Ratios averaged across banks need each bank's own ratios first
+    if ratio_weight is not None:
+        if ratio_weight not in fdic_df.columns:
+            raise ValueError(f"Cannot weight ratios by {ratio_weight}: not one of the FDIC fields")
+        with stage('compute_derived_metrics', rows=len(fdic_df)):
+            fdic_df = compute_derived_metrics(fdic_df, MODELING_TABLE_METRICS)
+
+    with stage('aggregate_small_banks', rows=len(fdic_df)):
+        buckets = assign_buckets(fdic_df, bucket_by, best_ranks_df)
+        is_high_rank = fdic_df['cert'].isin(high_rank_certs)
+
+        high_rank_df = fdic_df[is_high_rank].assign(bucket=buckets[is_high_rank], bank_count=np.int32(1))
+        weighted_fields = {}
+        if ratio_weight is not None:
+            weighted_fields = {metric['name']: ratio_weight for metric in MODELING_TABLE_METRICS if metric['name'] in fdic_df.columns}
+        low_rank_aggregated_df = aggregate_buckets(fdic_df[~is_high_rank], buckets[~is_high_rank], weighted_fields)
+
+        combined_df = pd.concat([high_rank_df, low_rank_aggregated_df], ignore_index=True)
+        combined_df['bucket'] = combined_df['bucket'].astype(buckets.dtype)
+
+    if ratio_weight is None:
+        with stage('compute_derived_metrics', rows=len(combined_df)):
+            combined_df = compute_derived_metrics(combined_df, MODELING_TABLE_METRICS)
+
+    with stage('merge_with_fred_data', rows=len(combined_df)):
+        merged_df = merge_with_fred_data(combined_df, fred_data_path, fred_fields)
+
+    with stage('write_output', rows=len(merged_df)):
+        merged_df = merged_df.sort_values(by=['cert', 'date'])
+        merged_df.to_csv(output_path, index=False)
+    print(f"Merged data with {bucket_by} buckets saved to {output_path}")
+
+def annualize_quarter(quarter_df, previous_raw_df, annualize_fields, month):
+    """
+    Annualize the year-to-date fields of a single quarter, the streaming counterpart of annualize_ytd_fields.
     
-    # Sort by cert and date
-    merged_df = merged_df.sort_values(by=['cert', 'date'])
+    Args:
+    quarter_df (pd.DataFrame): Quarter data indexed by cert with raw_{field} columns.
+    previous_raw_df (pd.DataFrame): Latest earlier raw_{field} values of each cert, or None for the first quarter.
+    annualize_fields (list): List of field names to annualize.
+    month (int): Month of the quarter's report date.
+    
+    Returns:
+    pd.DataFrame: DataFrame indexed by cert with an annualized_{field} column per field.
+    """
+    raw_columns = [f'raw_{field}' for field in annualize_fields]
+    raw_df = quarter_df[raw_columns]
 
-    # Save the merged data to CSV
-    output_path = output_path_template.format(rank_threshold)
-    merged_df.to_csv(output_path, index=False)
-    print(f"Merged data saved to {output_path}")
+    if month == 3 or previous_raw_df is None:
+        annualized_df = raw_df * 4
+    else:
+        # Certs without an earlier quarter default to their own value, as in annualize_ytd_fields
+        annualized_df = (raw_df - previous_raw_df.reindex(raw_df.index).fillna(0.0)) * 4
+
+    return annualized_df.set_axis([f'annualized_{field.split("_")[-1]}' for field in annualize_fields], axis=1)
+
+def stream_modeling_table(fdic_data_path, fred_data_path, best_ranks_path, output_path, annualize_fields, non_annualize_fields, fred_fields, rank_threshold=None, start_year=1950, chunk_quarters=8):
+    """
+    Build the modeling table one quarter at a time, writing it to CSV in chunks.
+    
+    Memory use is bounded by a few quarters of data plus the latest raw values of each cert, so the table can be
+    built for all banks. Unlike process_and_merge_data the output uses compact dtypes (int32 cert with
+    AGGREGATED_CERT for the small bank aggregate, int32 YYYYMMDD dates, float32 ratios and rates) and is ordered by
+    date, then cert.
+    
+    Args:
+    fdic_data_path (str): Path to the directory containing FDIC data CSV files.
+    fred_data_path (str): Path to the FRED data CSV file.
+    best_ranks_path (str): Path to the institution details CSV file with Best_Asset_Rank.
+    output_path (str): Path to write the output CSV file to.
+    annualize_fields (list): List of fields that need to be annualized.
+    non_annualize_fields (list): List of fields that don't need annualization.
+    fred_fields (list): List of FRED fields to merge.
+    rank_threshold (int): Keep certs with a best rank at or above this; aggregate the rest. None keeps all banks.
+    start_year (int): The starting year to process files from.
+    chunk_quarters (int): Number of quarters to buffer before each write.
+    """
+    with stage('load_fred_data'):
+        fred_df = load_fred_data(fred_data_path, fred_fields)
+
+    high_rank_certs = None
+    if rank_threshold is not None:
+        best_ranks_df = pd.read_csv(best_ranks_path)
+        high_rank_certs = best_ranks_df.loc[best_ranks_df['Best_Asset_Rank'] <= rank_threshold, 'Cert'].to_numpy()
+
+    previous_raw_df = None
+    raw_columns = [f'raw_{field}' for field in annualize_fields]
+    ratio_columns = [metric['name'] for metric in MODELING_TABLE_METRICS]
+    chunk = []
+    header = True
+    rows_written = 0
+
+    def write_chunk(chunk, header):
+        with stage('write_chunk', rows=sum(len(frame) for frame in chunk)):
+            pd.concat(chunk, ignore_index=True).to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+
+    for date, quarter_df in iter_fdic_quarters(fdic_data_path, annualize_fields, non_annualize_fields, start_year):
+        # Aggregate low rank data into a single reserved cert
+        if high_rank_certs is not None:
+            is_high_rank = quarter_df.index.isin(high_rank_certs)
+            if not is_high_rank.all():
+                aggregated_df = quarter_df[~is_high_rank].sum().to_frame(AGGREGATED_CERT).T
+                quarter_df = pd.concat([quarter_df[is_high_rank], aggregated_df])
+                quarter_df.index = quarter_df.index.astype('int32')
+                quarter_df.index.name = 'cert'
+
+        # Annualize against each cert's latest earlier quarter
+        annualized_df = annualize_quarter(quarter_df, previous_raw_df, annualize_fields, int(date[4:6]))
+        previous_raw_df = quarter_df[raw_columns] if previous_raw_df is None else quarter_df[raw_columns].combine_first(previous_raw_df)
+
+        quarter_df = pd.concat([quarter_df, annualized_df], axis=1).reset_index()
+        quarter_df.insert(0, 'date', pd.Series(int(date), index=quarter_df.index, dtype='int32'))
+
+        # Calculate additional fields
+        quarter_df = compute_derived_metrics(quarter_df, MODELING_TABLE_METRICS)
+        quarter_df = quarter_df.astype({column: 'float32' for column in ratio_columns if column in quarter_df.columns})
+
+        # Attach the latest FRED values on or before the report date
+        position = fred_df.index.searchsorted(pd.to_datetime(date, format='%Y%m%d'), side='right') - 1
+        for field in fred_fields:
+            value = fred_df[field].iat[position] if position >= 0 else float('nan')
+            quarter_df[field] = pd.Series(value, index=quarter_df.index, dtype='float32')
+
+        chunk.append(quarter_df)
+        if len(chunk) >= chunk_quarters:
+            write_chunk(chunk, header)
+            rows_written += sum(len(frame) for frame in chunk)
+            header = False
+            chunk = []
+
+    if chunk:
+        write_chunk(chunk, header)
+        rows_written += sum(len(frame) for frame in chunk)
+
+    print(f"Streamed {rows_written} rows to {output_path}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the bank modeling table from FDIC and FRED data.")
+    parser.add_argument('--rank-threshold', type=int, nargs='+', default=[200], help='Aggregate banks whose best asset rank is below this; several thresholds are built in one run')
+    parser.add_argument('--all-banks', action='store_true', help='Keep every bank instead of aggregating small banks')
+    parser.add_argument('--start-year', type=int, default=1950, help='The starting year to process files from')
+    parser.add_argument('--stream', action='store_true', help='Build quarter by quarter in bounded memory, with compact dtypes')
+    parser.add_argument('--bucket-by', type=str, help="Aggregate small banks per bucket: 'asset_tier', or a column of the institution details holding state codes")
+    parser.add_argument('--ratio-weight', type=str, help='With --bucket-by, average bank ratios weighted by this field (e.g. ASSET) instead of taking ratios of bucket totals')
+    args = parser.parse_args()
+
     annualize_fields = ['EDEPDOM', 'INTINCY', 'NONII']
     non_annualize_fields = ['DEPDOM', 'DEP', 'DEPFOR', 'DEPNIDOM', 'DEPIDOM', 'BRO', 'DEPINS', 'LNLSNET', 'SC', 'ASSET', 'LNCON']
     fred_fields = ['ff_t', 'ff_e', 't_1m', 't_3m', 't_6m', 't_12m', 't_2y', 't_3y', 't_5y', 't_7y', 't_10y', 't_30y']
-    rank_threshold = 200
-    start_year = 1950
+    rank_thresholds = args.rank_threshold
+    rank_threshold = None if args.all_banks else rank_thresholds[0]
+    start_year = args.start_year
+
+    if len(rank_thresholds) > 1 and (args.stream or args.all_banks):
+        parser.error("several --rank-threshold values cannot be combined with --stream or --all-banks")
+    if rank_threshold is None and not args.stream:
+        parser.error("--all-banks requires --stream")
+    if args.bucket_by and (len(rank_thresholds) > 1 or args.stream or args.all_banks):
+        parser.error("--bucket-by builds one rank threshold in memory; it cannot be combined with --stream or --all-banks")
+    if args.ratio_weight and not args.bucket_by:
+        parser.error("--ratio-weight requires --bucket-by")
 
-    process_and_merge_data(FDIC_DATA_PATH, FRED_DATA_PATH, BEST_RANKS_PATH, OUTPUT_PATH_TEMPLATE, annualize_fields, non_annualize_fields, fred_fields, rank_threshold, start_year)
+    start_run('create_modeling_table')
+    if args.bucket_by:
+        output_path = OUTPUT_PATH_TEMPLATE.format(f'{rank_threshold}_{args.bucket_by}')
+        process_and_merge_data_by_bucket(FDIC_DATA_PATH, FRED_DATA_PATH, BEST_RANKS_PATH, output_path, annualize_fields, non_annualize_fields, fred_fields, rank_threshold, start_year, args.bucket_by, args.ratio_weight)
+    elif len(rank_thresholds) > 1:
+        process_and_merge_data_for_thresholds(FDIC_DATA_PATH, FRED_DATA_PATH, BEST_RANKS_PATH, OUTPUT_PATH_TEMPLATE, annualize_fields, non_annualize_fields, fred_fields, rank_thresholds, start_year)
+    elif args.stream:
+        output_path = OUTPUT_PATH_TEMPLATE.format('all' if rank_threshold is None else rank_threshold)
+        stream_modeling_table(FDIC_DATA_PATH, FRED_DATA_PATH, BEST_RANKS_PATH, output_path, annualize_fields, non_annualize_fields, fred_fields, rank_threshold, start_year)
+    else:
+        process_and_merge_data(FDIC_DATA_PATH, FRED_DATA_PATH, BEST_RANKS_PATH, OUTPUT_PATH_TEMPLATE, annualize_fields, non_annualize_fields, fred_fields, rank_threshold, start_year)
+    finish_run()
@@ -2,12 +2,16 @@
 # Imports
 
 import requests
+import asyncio
 from collections import Counter
 import pandas as pd
-import time
 import logging
 import os
 
+from fdic_cert_index import CERT_INDEX_PATH, update_cert_index
+from fdic_client import FDIC_COLUMNS, FDICClient, download_quarters, get_certs, get_report_dates, stream_quarter_rows
+from instrumentation import finish_run, stage, start_run
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -63,26 +67,7 @@ def get_all_report_dates():
     """
     Retrieves a list of all available reporting dates from the FDIC financials database, sorted with the latest dates first.
     """
-    base_url = "https://banks.data.fdic.gov/api/financials"
-    params = {
-        "fields": "ID",
-        "limit": 1000,
-        "format": "json",
-        "download": "false"
-    }
-    response = requests.get(base_url, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        if 'data' in data and len(data['data']) > 0:
-            dates = list({entry['data']['ID'].split('_')[1] for entry in data['data']})
-            sorted_dates = sorted(dates, reverse=True)
-            return sorted_dates
-        else:
-            print("No data found.")
-            return []
-    else:
-        print(f"Failed to retrieve data. Status code: {response.status_code}")
-        return []
+    return asyncio.run(get_report_dates(FDICClient()))
     
 
 def get_certs_by_date(report_date, limit=10000):
@@ -96,35 +81,7 @@ def get_certs_by_date(report_date, limit=10000):
     Returns:
     list: A list of certificate IDs (Certs) for the given reporting date.
     """
-    base_url = "https://banks.data.fdic.gov/api/financials"
-    
-    params = {
-        "filters": f"REPDTE:{report_date}",
-        "fields": "CERT",
-        "limit": limit,
-        "format": "json",
-        "download": "false",
-        "offset": 0
-    }
-    
-    certs = []
-    
-    while True:
-        try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()
-        except requests.RequestException as e:
-            logger.error(f"Failed to retrieve data: {e}")
-            break
-        
-        data = response.json()
-        if 'data' in data and len(data['data']) > 0:
-            certs.extend(entry['data']['CERT'] for entry in data['data'])
-            params['offset'] += limit
-        else:
-            break
-    
-    return certs
+    return asyncio.run(get_certs(FDICClient(page_size=limit), report_date))
 
 def find_duplicate_certs(certs):
     """
@@ -163,61 +120,10 @@ def build_dataframe_for_date(report_date, cert_ids, fields):
     Returns:
     pd.DataFrame: A DataFrame with columns ['Date', 'Cert', 'Field', 'Value'].
     """
-    # Define the base URL
-    base_url = "https://banks.data.fdic.gov/api/financials"
-    
-    # Initialize an empty list to store the rows
-    rows = []
-    batch_size = 100  # Set batch size
-    total_batches = (len(cert_ids) + batch_size - 1) // batch_size
-    
-    # Track time
-    start_time = time.time()
-    
-    # Process cert_ids in batches
-    for i in range(0, len(cert_ids), batch_size):
-        batch_certs = cert_ids[i:i + batch_size]
-        batch_filter = " OR ".join([f"CERT:{cert}" for cert in batch_certs])
-        
-        # Define the parameters for the API request
-        params = {
-            "filters": f"({batch_filter}) AND REPDTE:{report_date}",
-            "fields": ",".join(["CERT", "REPDTE"] + fields),
-            "limit": batch_size,
-            "format": "json",
-            "download": "false"
-        }
-        
-        # Make the API request
-        response = requests.get(base_url, params=params)
-        
-        # Check if the request was successful
-        if response.status_code == 200:
-            data = response.json()
-            if 'data' in data and len(data['data']) > 0:
-                for entry in data['data']:
-                    cert_data = entry['data']
-                    for field in fields:
-                        if field in cert_data:
-                            rows.append({
-                                "Date": report_date,
-                                "Cert": cert_data["CERT"],
-                                "Field": field,
-                                "Value": cert_data[field]
-                            })
-        else:
-            print(f"Failed to retrieve data for certs in batch {i//batch_size + 1}. Status code: {response.status_code}")
-        
-        # Print progress update every 10 batches
-        if (i // batch_size + 1) % 10 == 0 or (i // batch_size + 1) == total_batches:
-            elapsed_time = time.time() - start_time
-            estimated_total_time = (elapsed_time / (i // batch_size + 1)) * total_batches
-            estimated_remaining_time = estimated_total_time - elapsed_time
-            print(f"{i // batch_size + 1} out of {total_batches} batches running. Seconds run: {elapsed_time:.2f}; Estimated seconds remaining: {estimated_remaining_time:.2f}")
-    
-    # Create a DataFrame from the collected rows
-    df = pd.DataFrame(rows, columns=['Date', 'Cert', 'Field', 'Value'])
-    return df
+    async def collect_rows():
+        return [row async for row in stream_quarter_rows(FDICClient(), report_date, fields, certs=list(cert_ids))]
+
+    return pd.DataFrame(asyncio.run(collect_rows()), columns=FDIC_COLUMNS)
 
 
 #%%
@@ -285,13 +191,14 @@ if __name__ == "__main__":
     os.makedirs(output_dir, exist_ok=True)
 
     # Execute code
-    report_dates = get_all_report_dates()
-    for report_date in report_dates:
-        filename = os.path.join(output_dir, f"{report_date}.csv")
-        if os.path.isfile(filename):
-            print(f"{filename} exists; skipping")
-        else:
-            print(f"{filename} doesn't exist. Time to download")
-            certs = get_certs_by_date(report_date)
-            df = build_dataframe_for_date(report_date, certs, fields)
-            df.to_csv(filename, index=False)
\ No newline at end of file
+    start_run('dataDownload_fdic')
+    with stage('get_all_report_dates'):
+        report_dates = get_all_report_dates()
+    try:
+        with stage('download_quarters') as record:
+            record['rows'] = asyncio.run(download_quarters(FDICClient(), report_dates, fields, output_dir))
+    finally:
+        # Index the quarters that did download, even if others failed
+        with stage('update_cert_index') as record:
+            record['files_indexed'] = update_cert_index(output_dir, CERT_INDEX_PATH)
+    finish_run()
\ No newline at end of file
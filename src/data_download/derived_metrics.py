@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+# Ratio metrics added to the modeling table. Each definition names the output column, its numerator
+# and denominator columns, and optionally the values to use when an input is null ('null_value') or
+# the denominator is zero ('zero_value'); both default to NaN.
+MODELING_TABLE_METRICS = [
+    {'name': 'insured_deposit_percentage', 'numerator': 'DEPINS', 'denominator': 'DEPDOM'},
+    {'name': 'nib_deposit_percentage', 'numerator': 'DEPNIDOM', 'denominator': 'DEPDOM'},
+    {'name': 'brokered_deposit_percentage', 'numerator': 'BRO', 'denominator': 'DEPDOM'},
+    {'name': 'securities_asset_percentage', 'numerator': 'SC', 'denominator': 'ASSET'},
+    {'name': 'nonii_revenue_percentage', 'numerator': 'annualized_NONII', 'denominator': 'annualized_INCY'},
+    {'name': 'deposit_expense_rate', 'numerator': 'annualized_EDEPDOM', 'denominator': 'DEPDOM'},
+]
+
+def evaluate_metric(df, metric):
+    """
+    Evaluate a single ratio metric definition as a vectorized column operation.
+
+    Args:
+    df (pd.DataFrame): DataFrame containing the numerator and denominator columns.
+    metric (dict): Metric definition with 'name', 'numerator', 'denominator' and optional 'null_value' and 'zero_value'.
+
+    Returns:
+    pd.Series: The metric values, or None if an input column is missing.
+    """
+    if metric['numerator'] not in df.columns or metric['denominator'] not in df.columns:
+        return None
+
+    numerator = pd.to_numeric(df[metric['numerator']], errors='coerce').to_numpy(dtype='float64')
+    denominator = pd.to_numeric(df[metric['denominator']], errors='coerce').to_numpy(dtype='float64')
+
+    is_null = np.isnan(numerator) | np.isnan(denominator)
+    is_zero = ~is_null & (denominator == 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = numerator / denominator
+    values[is_null] = metric.get('null_value', np.nan)
+    values[is_zero] = metric.get('zero_value', np.nan)
+
+    return pd.Series(values, index=df.index, name=metric['name'])
+
+def compute_derived_metrics(df, metrics=MODELING_TABLE_METRICS):
+    """
+    Add all derived metrics to a DataFrame in one pass.
+
+    Metrics whose input columns are missing are skipped.
+
+    Args:
+    df (pd.DataFrame): DataFrame containing the input columns.
+    metrics (list): List of metric definitions (see MODELING_TABLE_METRICS).
+
+    Returns:
+    pd.DataFrame: DataFrame with a column added (or replaced) for each metric.
+    """
+    columns = {}
+    for metric in metrics:
+        values = evaluate_metric(df, metric)
+        if values is not None:
+            columns[metric['name']] = values
+
+    if not columns:
+        return df
+
+    return pd.concat([df.drop(columns=[name for name in columns if name in df.columns]), pd.DataFrame(columns)], axis=1)
@@ -0,0 +1,197 @@
+import io
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+FDIC_DATA_PATH = './data/raw/fdic'
+CERT_INDEX_PATH = './data/raw/fdic_index'
+
+# Columns of the long-format FDIC quarter files saved by dataDownload_fdic.py
+FDIC_COLUMNS = ['Date', 'Cert', 'Field', 'Value']
+
+def index_quarter_file(file_path):
+    """
+    Find the byte range of each cert's rows in a long-format FDIC quarter file.
+
+    The rows of a cert are written together, so each cert normally has one range per file; a cert whose rows are
+    split up gets one range per run of consecutive rows.
+
+    Args:
+    file_path (str): Path to the FDIC quarter CSV file.
+
+    Returns:
+    tuple: (certs, start offsets, end offsets) arrays, one entry per run of rows, in file order.
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    # Byte offset of the start of every line after the header, and of the end of the last line
+    line_ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord('\n')) + 1
+    if len(data) and data[-1:] != b'\n':
+        line_ends = np.append(line_ends, len(data))
+    certs = pd.read_csv(io.BytesIO(data), usecols=['Cert'], dtype={'Cert': 'int32'})['Cert'].to_numpy()
+    if len(certs) != len(line_ends) - 1:
+        raise ValueError(f"{file_path} has {len(line_ends) - 1} data lines but {len(certs)} rows; cannot index it by byte range")
+    if len(certs) == 0:
+        return np.empty(0, dtype='int32'), np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+
+    line_starts = line_ends[:-1]
+    run_starts = np.flatnonzero(np.r_[True, certs[1:] != certs[:-1]])
+    run_ends = np.r_[run_starts[1:], len(certs)]
+    return certs[run_starts], line_starts[run_starts].astype('int64'), line_ends[1:][run_ends - 1].astype('int64')
+
+def load_cert_index(index_path=CERT_INDEX_PATH):
+    """
+    Memory-map the cert index.
+
+    Args:
+    index_path (str): Path to the cert index directory.
+
+    Returns:
+    dict: 'files' (manifest entries of the indexed quarter files, in date order) and the 'certs', 'file_ids', 'starts'
+    and 'ends' arrays, sorted by cert and then date; or None if no index has been built.
+    """
+    manifest_path = os.path.join(index_path, 'manifest.json')
+    if not os.path.isfile(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    index = {'files': manifest['files']}
+    for name in ['certs', 'file_ids', 'starts', 'ends']:
+        index[name] = np.load(os.path.join(index_path, f'{name}.npy'), mmap_mode='r')
+    return index
+
+def is_file_current(file_entry, fdic_data_path):
+    """
+    Check whether a quarter file still has the size and modification time it was indexed with.
+    """
+    try:
+        stat = os.stat(os.path.join(fdic_data_path, file_entry['name']))
+    except FileNotFoundError:
+        return False
+    return file_entry['size'] == stat.st_size and file_entry['mtime'] == stat.st_mtime
+
+def update_cert_index(fdic_data_path=FDIC_DATA_PATH, index_path=CERT_INDEX_PATH):
+    """
+    Bring the cert index up to date with the FDIC quarter files, indexing only new or changed files.
+
+    Args:
+    fdic_data_path (str): Path to the directory containing FDIC data CSV files.
+    index_path (str): Path to the cert index directory.
+
+    Returns:
+    int: Number of quarter files indexed by this call.
+    """
+    file_names = sorted(file_name for file_name in os.listdir(fdic_data_path) if file_name.endswith('.csv'))
+    index = load_cert_index(index_path)
+    previous_files = {} if index is None else {entry['name']: file_id for file_id, entry in enumerate(index['files'])}
+
+    # Entries of files indexed before, grouped by file
+    if index is not None:
+        order = np.argsort(index['file_ids'], kind='stable')
+        bounds = np.searchsorted(index['file_ids'][order], np.arange(len(index['files']) + 1))
+
+    files, parts = [], []
+    indexed_count = 0
+    for file_name in file_names:
+        file_path = os.path.join(fdic_data_path, file_name)
+        stat = os.stat(file_path)
+        entry = {'name': file_name, 'size': stat.st_size, 'mtime': stat.st_mtime}
+        previous_id = previous_files.get(file_name)
+        if previous_id is not None and is_file_current(index['files'][previous_id], fdic_data_path):
+            rows = order[bounds[previous_id]:bounds[previous_id + 1]]
+            certs, starts, ends = index['certs'][rows], index['starts'][rows], index['ends'][rows]
+        else:
+            certs, starts, ends = index_quarter_file(file_path)
+            indexed_count += 1
+        parts.append((np.full(len(certs), len(files), dtype='int32'), certs, starts, ends))
+        files.append(entry)
+
+    if indexed_count == 0 and index is not None and len(files) == len(index['files']):
+        return 0
+
+    file_ids, certs, starts, ends = (np.concatenate([part[i] for part in parts]) if parts else np.empty(0) for i in range(4))
+    # Files are in date order, so sorting by cert then file gives each cert's history in date order
+    order = np.lexsort((starts, file_ids, certs))
+    arrays = {
+        'certs': certs[order].astype('int32'),
+        'file_ids': file_ids[order].astype('int32'),
+        'starts': starts[order].astype('int64'),
+        'ends': ends[order].astype('int64'),
+    }
+
+    # Write the manifest last so an interrupted update is redone on the next run
+    os.makedirs(index_path, exist_ok=True)
+    manifest_path = os.path.join(index_path, 'manifest.json')
+    if os.path.isfile(manifest_path):
+        os.remove(manifest_path)
+    for name, array in arrays.items():
+        # Replace rather than overwrite, as readers may have the old arrays mapped
+        tmp_path = os.path.join(index_path, f'.{name}.tmp.npy')
+        np.save(tmp_path, array)
+        os.replace(tmp_path, os.path.join(index_path, f'{name}.npy'))
+    with open(manifest_path, 'w') as f:
+        json.dump({'files': files}, f, indent=2)
+    print(f"Cert index covers {len(files)} quarter files ({indexed_count} indexed now); saved to {index_path}")
+    return indexed_count
+
+def get_cert_history(cert, fields=None, fdic_data_path=FDIC_DATA_PATH, index_path=CERT_INDEX_PATH, refresh=True):
+    """
+    Read one bank's rows from every quarter file, touching only the byte ranges the cert index points to.
+
+    Args:
+    cert (int): The certificate ID of the institution.
+    fields (list): Fields to keep, or None for all fields.
+    fdic_data_path (str): Path to the directory containing FDIC data CSV files.
+    index_path (str): Path to the cert index directory.
+    refresh (bool): Update the index first if quarter files were added or changed since it was built.
+
+    Returns:
+    pd.DataFrame: The bank's rows with columns ['Date', 'Cert', 'Field', 'Value'], in date order.
+    """
+    index = load_cert_index(index_path)
+    if refresh and (index is None or any(not is_file_current(entry, fdic_data_path) for entry in index['files'])
+                    or len(index['files']) != sum(file_name.endswith('.csv') for file_name in os.listdir(fdic_data_path))):
+        update_cert_index(fdic_data_path, index_path)
+        index = load_cert_index(index_path)
+    if index is None:
+        raise FileNotFoundError(f"No cert index in {index_path}; build it with update_cert_index")
+
+    first, last = np.searchsorted(index['certs'], cert, side='left'), np.searchsorted(index['certs'], cert, side='right')
+    chunks = []
+    open_file, open_file_id = None, None
+    try:
+        for file_id, start, end in zip(index['file_ids'][first:last], index['starts'][first:last], index['ends'][first:last]):
+            if file_id != open_file_id:
+                if open_file is not None:
+                    open_file.close()
+                open_file = open(os.path.join(fdic_data_path, index['files'][file_id]['name']), 'rb')
+                open_file_id = file_id
+            open_file.seek(start)
+            chunks.append(open_file.read(end - start))
+    finally:
+        if open_file is not None:
+            open_file.close()
+
+    history_df = pd.read_csv(io.BytesIO(b''.join(chunks)), names=FDIC_COLUMNS, header=None, dtype={'Date': str, 'Field': str}) if chunks else pd.DataFrame(columns=FDIC_COLUMNS)
+    if fields is not None:
+        history_df = history_df[history_df['Field'].isin(fields)].reset_index(drop=True)
+    return history_df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the cert index over the raw FDIC files, or print one bank's history from it.")
+    parser.add_argument('--cert', type=int, help="Print this bank's field history, one row per date")
+    parser.add_argument('--fields', type=str, nargs='+', help='Fields to print (default: all)')
+    args = parser.parse_args()
+
+    if args.cert is None:
+        update_cert_index(FDIC_DATA_PATH, CERT_INDEX_PATH)
+    else:
+        history_df = get_cert_history(args.cert, args.fields)
+        if history_df.empty:
+            print(f"No rows found for cert {args.cert}.")
+        else:
+            print(history_df.pivot_table(index='Date', columns='Field', values='Value', aggfunc='first').to_string())
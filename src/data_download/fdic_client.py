@@ -0,0 +1,284 @@
+import os
+import csv
+import time
+import asyncio
+import datetime
+import logging
+import itertools
+import collections
+import requests
+
+from instrumentation import ProgressTracker
+
+logger = logging.getLogger(__name__)
+
+FDIC_API_URL = 'https://banks.data.fdic.gov/api'
+
+# Largest page the FDIC API returns
+MAX_PAGE_SIZE = 10000
+
+# First year with quarterly financials in the FDIC API
+FIRST_REPORT_YEAR = 1984
+
+# Columns of the long-format FDIC quarter files
+FDIC_COLUMNS = ['Date', 'Cert', 'Field', 'Value']
+
+class FDICClient:
+    """Asynchronous client for the FDIC BankFind API, with one paginator shared by every endpoint."""
+
+    def __init__(self, base_url=FDIC_API_URL, page_size=MAX_PAGE_SIZE, max_concurrency=8, retries=3, session=None):
+        """
+        Args:
+        base_url (str): API root URL.
+        page_size (int): Records requested per page.
+        max_concurrency (int): Most requests in flight at once, across all callers of the client.
+        retries (int): Times a request is retried after a connection error, timeout, 429 or 5xx response, with
+        exponential backoff.
+        session (requests.Session): Session to send requests with; a new one by default.
+        """
+        self.base_url = base_url
+        self.page_size = page_size
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.session = session or requests.Session()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _get(self, endpoint, params):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(f'{self.base_url}/{endpoint}', params=params, timeout=60)
+                response.raise_for_status()
+                return response.json()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                # Client errors other than throttling, such as a bad filter, would fail again
+                status_code = getattr(e.response, 'status_code', None)
+                if attempt == self.retries or (status_code is not None and status_code != 429 and status_code < 500):
+                    raise
+                logger.warning(f"Request to {endpoint} failed ({e}); retrying")
+                time.sleep(2 ** attempt)
+
+    async def get_page(self, endpoint, params, offset=0, limit=None):
+        """
+        Fetch one page of records from an endpoint.
+
+        Args:
+        endpoint (str): API endpoint, e.g. 'financials'.
+        params (dict): Query parameters such as filters, fields and sort_by.
+        offset (int): Index of the first record to return.
+        limit (int): Number of records to return; defaults to the client's page size.
+
+        Returns:
+        tuple: (list of record dicts, total number of records matching the query, or None if not reported).
+        """
+        params = dict(params, offset=offset, limit=self.page_size if limit is None else limit, format='json', download='false')
+        async with self.semaphore:
+            # requests is blocking, so each request runs in a worker thread
+            data = await asyncio.to_thread(self._get, endpoint, params)
+        records = [entry['data'] for entry in data.get('data', [])]
+        total = data.get('meta', {}).get('total', data.get('totals', {}).get('count'))
+        return records, total
+
+    async def paginate(self, endpoint, params):
+        """
+        Yield every record matching a query, in order, page by page.
+
+        The first page gives the total; the following pages are fetched up to max_concurrency at a time ahead of the
+        consumer, so memory stays at a few pages however many records match. params should sort the records on a
+        unique key (e.g. sort_by CERT within a report date) so that pages do not overlap.
+
+        Args:
+        endpoint (str): API endpoint, e.g. 'financials'.
+        params (dict): Query parameters such as filters, fields and sort_by.
+
+        Yields:
+        dict: One record's fields.
+        """
+        records, total = await self.get_page(endpoint, params)
+        for record in records:
+            yield record
+
+        if total is None:
+            # Without a total, keep paging until a page comes back short
+            offset = len(records)
+            while len(records) == self.page_size:
+                records, _ = await self.get_page(endpoint, params, offset)
+                for record in records:
+                    yield record
+                offset += len(records)
+            return
+
+        offsets = iter(range(self.page_size, total, self.page_size))
+        pending = collections.deque(asyncio.create_task(self.get_page(endpoint, params, offset)) for offset in itertools.islice(offsets, self.max_concurrency))
+        try:
+            while pending:
+                records, _ = await pending.popleft()
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(asyncio.create_task(self.get_page(endpoint, params, offset)))
+                for record in records:
+                    yield record
+        finally:
+            for task in pending:
+                task.cancel()
+
+def get_quarter_ends(first_year=FIRST_REPORT_YEAR, today=None):
+    """
+    Return every quarter-end date from first_year up to today in YYYYMMDD format, oldest first.
+    """
+    today = today or datetime.date.today()
+    quarter_ends = []
+    for year in range(first_year, today.year + 1):
+        for month_day in ['0331', '0630', '0930', '1231']:
+            if f'{year}{month_day}' <= today.strftime('%Y%m%d'):
+                quarter_ends.append(f'{year}{month_day}')
+    return quarter_ends
+
+async def get_report_dates(client, first_year=FIRST_REPORT_YEAR):
+    """
+    Find every reporting date in the FDIC financials database, latest first.
+
+    Each quarter end since first_year is checked with a one-record query, all of them concurrently, so discovery
+    costs one small request per quarter rather than paging through every bank's filings. Quarters whose check fails
+    are logged and left out, to be picked up on the next run; if every check fails, the first error is raised.
+
+    Args:
+    client (FDICClient): API client.
+    first_year (int): First year to check.
+
+    Returns:
+    list: Reporting dates in YYYYMMDD format, sorted with the latest dates first.
+    """
+    quarter_ends = get_quarter_ends(first_year)
+    pages = await asyncio.gather(*(client.get_page('financials', {'filters': f'REPDTE:{date}', 'fields': 'REPDTE'}, limit=1) for date in quarter_ends), return_exceptions=True)
+    errors = [page for page in pages if isinstance(page, Exception)]
+    if errors and len(errors) == len(pages):
+        raise errors[0]
+    report_dates = []
+    for date, page in zip(quarter_ends, pages):
+        if isinstance(page, Exception):
+            logger.warning(f"Could not check report date {date}: {page}")
+        elif page[0]:
+            report_dates.append(date)
+    return sorted(report_dates, reverse=True)
+
+async def get_certs(client, report_date):
+    """
+    Return the certificate IDs (Certs) of every institution reporting on a date.
+
+    Args:
+    client (FDICClient): API client.
+    report_date (str): The reporting date in YYYYMMDD format.
+
+    Returns:
+    list: Certificate IDs, in ascending order.
+    """
+    params = {'filters': f'REPDTE:{report_date}', 'fields': 'CERT', 'sort_by': 'CERT', 'sort_order': 'ASC'}
+    return [record['CERT'] async for record in client.paginate('financials', params)]
+
+async def stream_quarter_rows(client, report_date, fields, certs=None, batch_size=100):
+    """
+    Yield the long-format rows of a reporting date, one (Date, Cert, Field, Value) tuple per reported field.
+
+    Rows come out grouped by cert in ascending order, as the cert index over the quarter files expects.
+
+    Args:
+    client (FDICClient): API client.
+    report_date (str): The reporting date in YYYYMMDD format.
+    fields (list): Field names to retrieve for each institution.
+    certs (list): Certificate IDs to include, queried batch_size at a time; None for every institution.
+    batch_size (int): Certs per query when certs are given.
+
+    Yields:
+    tuple: (Date, Cert, Field, Value).
+    """
+    if certs is None:
+        filters = [f'REPDTE:{report_date}']
+    else:
+        filters = [f"({' OR '.join(f'CERT:{cert}' for cert in certs[i:i + batch_size])}) AND REPDTE:{report_date}" for i in range(0, len(certs), batch_size)]
+
+    for query_filter in filters:
+        params = {'filters': query_filter, 'fields': ','.join(['CERT', 'REPDTE'] + fields), 'sort_by': 'CERT', 'sort_order': 'ASC'}
+        async for record in client.paginate('financials', params):
+            for field in fields:
+                if field in record:
+                    yield report_date, record['CERT'], field, record[field]
+
+async def write_quarter(client, report_date, fields, file_path):
+    """
+    Stream a reporting date's rows into a long-format CSV file as they arrive.
+
+    The rows go to a temporary file that is renamed into place once complete, so an interrupted download is not
+    mistaken for a finished quarter.
+
+    Args:
+    client (FDICClient): API client.
+    report_date (str): The reporting date in YYYYMMDD format.
+    fields (list): Field names to retrieve for each institution.
+    file_path (str): Path of the CSV file to write.
+
+    Returns:
+    int: Number of rows written.
+    """
+    tmp_path = f'{file_path}.tmp'
+    rows = 0
+    try:
+        with open(tmp_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(FDIC_COLUMNS)
+            async for row in stream_quarter_rows(client, report_date, fields):
+                writer.writerow(row)
+                rows += 1
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+async def download_quarters(client, report_dates, fields, output_dir, max_quarters=4):
+    """
+    Download every reporting date that does not have a file in output_dir yet, several quarters at a time.
+
+    A failed quarter does not stop the others; the failures are logged and raised together once every quarter has
+    finished, leaving the completed quarter files in place.
+
+    Args:
+    client (FDICClient): API client.
+    report_dates (list): Reporting dates in YYYYMMDD format.
+    fields (list): Field names to retrieve for each institution.
+    output_dir (str): Directory of the quarter files, named <report_date>.csv.
+    max_quarters (int): Most quarters downloaded at once.
+
+    Returns:
+    int: Number of rows written.
+
+    Raises:
+    RuntimeError: If any quarter failed to download, from the first failure.
+    """
+    missing_dates = []
+    for report_date in report_dates:
+        filename = os.path.join(output_dir, f"{report_date}.csv")
+        if os.path.isfile(filename):
+            print(f"{filename} exists; skipping")
+        else:
+            print(f"{filename} doesn't exist. Time to download")
+            missing_dates.append(report_date)
+
+    progress = ProgressTracker('Downloading quarters', len(missing_dates), unit='quarters', first=0, every=10)
+    semaphore = asyncio.Semaphore(max_quarters)
+    done = 0
+
+    async def download(report_date):
+        nonlocal done
+        async with semaphore:
+            rows = await write_quarter(client, report_date, fields, os.path.join(output_dir, f"{report_date}.csv"))
+        done += 1
+        progress.update(done, rows)
+        return rows
+
+    results = await asyncio.gather(*(download(report_date) for report_date in missing_dates), return_exceptions=True)
+    failures = [(report_date, result) for report_date, result in zip(missing_dates, results) if isinstance(result, BaseException)]
+    for report_date, error in failures:
+        logger.error(f"Failed to download {report_date}: {error}")
+    if failures:
+        raise RuntimeError(f"Failed to download {len(failures)} of {len(missing_dates)} quarters: {', '.join(date for date, _ in failures)}") from failures[0][1]
+    return sum(results)
@@ -0,0 +1,225 @@
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import platform
+import tracemalloc
+import contextlib
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+REPORTS_PATH = './data/reports'
+
+# The run report that stage() records into; set by start_run()
+_active_report = None
+
+def get_max_rss_mb():
+    """
+    Return the peak resident memory of the process so far, in MB, or None if it cannot be measured.
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+def start_run(pipeline, profile=None, trace_memory=None):
+    """
+    Start recording a run report for a pipeline script.
+
+    Args:
+    pipeline (str): Name of the pipeline script, used in the report file name.
+    profile (bool): Capture a cProfile of each top-level stage; defaults to the PIPELINE_PROFILE environment variable.
+    trace_memory (bool): Track the peak Python memory of each stage with tracemalloc (slow); defaults to the
+    PIPELINE_TRACE_MEMORY environment variable.
+
+    Returns:
+    dict: The run report.
+    """
+    global _active_report
+    if profile is None:
+        profile = os.getenv('PIPELINE_PROFILE', '') not in ('', '0')
+    if trace_memory is None:
+        trace_memory = os.getenv('PIPELINE_TRACE_MEMORY', '') not in ('', '0')
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    _active_report = {
+        'pipeline': pipeline,
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'argv': sys.argv,
+        'profile': profile,
+        'trace_memory': trace_memory,
+        'stages': [],
+        '_start_time': time.perf_counter(),
+        '_stack': [],
+        '_profiles': {},
+        '_peaks': [],
+        '_started_tracing': started_tracing,
+    }
+    return _active_report
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    """
+    Time a pipeline stage and record it in the active run report.
+
+    The yielded dict is the stage's record; set its 'rows' entry to report throughput. Nested stages are recorded
+    with their parent's name as a prefix. Without an active run report the stage is not recorded.
+
+    Args:
+    name (str): Stage name.
+    rows (int): Number of rows processed, if known up front.
+
+    Yields:
+    dict: The stage record.
+    """
+    record = {'name': name, 'rows': rows}
+    report = _active_report
+    if report is None:
+        yield record
+        return
+
+    record['name'] = '/'.join(report['_stack'] + [name])
+    report['_stack'].append(name)
+
+    profiler = None
+    if report['profile'] and len(report['_stack']) == 1:
+        profiler = cProfile.Profile()
+    if report['trace_memory']:
+        # Fold the peak so far into the parent's before resetting, so a child stage does not hide it
+        if report['_peaks']:
+            report['_peaks'][-1] = max(report['_peaks'][-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        report['_peaks'].append(0)
+
+    start_time = time.perf_counter()
+    start_cpu = time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        record['seconds'] = time.perf_counter() - start_time
+        record['cpu_seconds'] = time.process_time() - start_cpu
+        record['max_rss_mb'] = get_max_rss_mb()
+        if report['trace_memory']:
+            peak = max(report['_peaks'].pop(), tracemalloc.get_traced_memory()[1])
+            if report['_peaks']:
+                report['_peaks'][-1] = max(report['_peaks'][-1], peak)
+            record['python_peak_mb'] = peak / (1024 * 1024)
+        if record['rows'] is not None and record['seconds'] > 0:
+            record['rows_per_second'] = record['rows'] / record['seconds']
+        if profiler is not None:
+            # Stages that run once per file or batch share one profile
+            if record['name'] in report['_profiles']:
+                report['_profiles'][record['name']].add(profiler)
+            else:
+                report['_profiles'][record['name']] = pstats.Stats(profiler, stream=io.StringIO())
+            record['top_functions'] = summarize_profile(profiler)
+        report['_stack'].pop()
+        report['stages'].append(record)
+
+def summarize_profile(profiler, limit=15):
+    """
+    Summarize a cProfile capture as its most expensive functions by cumulative time.
+
+    Args:
+    profiler (cProfile.Profile): The capture.
+    limit (int): Number of functions to keep.
+
+    Returns:
+    list: One dict per function with its location, call count, and total and cumulative seconds.
+    """
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {'function': f'{file_name}:{line}({function})', 'calls': calls, 'total_seconds': total_time, 'cumulative_seconds': cumulative_time}
+        for (file_name, line, function), (_, calls, total_time, cumulative_time, _) in entries
+    ]
+
+def finish_run(reports_path=REPORTS_PATH):
+    """
+    Finish the active run and write its JSON report, along with a .prof file per profiled stage name.
+
+    Args:
+    reports_path (str): Directory to write the report to.
+
+    Returns:
+    str: Path of the JSON report, or None if no run was started.
+    """
+    global _active_report
+    report = _active_report
+    if report is None:
+        return None
+    _active_report = None
+
+    os.makedirs(reports_path, exist_ok=True)
+    run_name = f"{report['pipeline']}_{time.strftime('%Y%m%d_%H%M%S')}"
+
+    profiles = report.pop('_profiles')
+    for stage_name, stats in profiles.items():
+        stats.dump_stats(os.path.join(reports_path, f"{run_name}_{stage_name.replace('/', '_')}.prof"))
+
+    report['seconds'] = time.perf_counter() - report.pop('_start_time')
+    report['max_rss_mb'] = get_max_rss_mb()
+    report.pop('_stack')
+    report.pop('_peaks')
+    if report.pop('_started_tracing'):
+        tracemalloc.stop()
+
+    # Totals per stage name, for stages that run once per file or batch
+    totals = {}
+    for record in report['stages']:
+        total = totals.setdefault(record['name'], {'count': 0, 'seconds': 0.0, 'rows': 0})
+        total['count'] += 1
+        total['seconds'] += record['seconds']
+        total['rows'] += record['rows'] or 0
+    report['totals'] = totals
+
+    report_path = os.path.join(reports_path, f'{run_name}.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Run report saved to {report_path}")
+    return report_path
+
+class ProgressTracker:
+    """Prints progress, elapsed time, expected time remaining and throughput for a loop over files or batches."""
+
+    def __init__(self, label, total, unit='files', first=5, every=15):
+        self.label = label
+        self.total = total
+        self.unit = unit
+        self.first = first
+        self.every = every
+        self.rows = 0
+        self.start_time = time.time()
+
+    def update(self, done, rows=0):
+        """
+        Record that `done` items are finished, printing on the first few, every `every`-th and the last.
+
+        Args:
+        done (int): Number of items finished so far.
+        rows (int): Rows processed by the latest item.
+        """
+        self.rows += rows
+        if done > self.first and done % self.every != 0 and done != self.total:
+            return
+
+        elapsed_time = time.time() - self.start_time
+        estimated_time_remaining = elapsed_time / done * (self.total - done) if done else 0.0
+        message = f"{self.label}: {done} out of {self.total} {self.unit}; elapsed time: {elapsed_time:.2f}s; expected time remaining: {estimated_time_remaining:.2f}s"
+        if self.rows and elapsed_time > 0:
+            message += f"; {self.rows / elapsed_time:,.0f} rows/s"
+        print(message)
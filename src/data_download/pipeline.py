@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+import concurrent.futures
+
+# Scripts use paths relative to the repository root, so stages run from there
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_STATE_PATH = './data/.pipeline_state.json'
+
+# Pipeline stages. Inputs and outputs are files or directories relative to the repository root; a stage depends on
+# the stages producing its inputs, and no two stages may write the same path. 'code' lists the modules whose content
+# is part of the cache key. 'external' stages pull from a remote API and only rerun with --refresh.
+STAGES = [
+    {
+        'name': 'fdic_download',
+        'script': 'dataDownload_fdic.py',
+        'code': ['fdic_cert_index.py', 'fdic_client.py', 'instrumentation.py'],
+        'inputs': [],
+        'outputs': ['data/raw/fdic', 'data/raw/fdic_index'],
+        'external': True,
+    },
+    {
+        'name': 'fred_download',
+        'script': 'dataDownload_fred.py',
+        'inputs': ['config.ini'],
+        'outputs': ['data/raw/rates/fred_data.csv'],
+        'external': True,
+    },
+    {
+        'name': 'rank_assets',
+        'script': 'processFDIC_RankAssets.py',
+        'code': ['dataDownload_fdic.py', 'fdic_cert_index.py', 'fdic_client.py', 'instrumentation.py'],
+        'inputs': ['data/raw/fdic'],
+        'outputs': ['data/processed/institution_details.csv'],
+    },
+    {
+        'name': 'modeling_table',
+        'script': 'create_modeling_table.py',
+        'args': ['--rank-threshold', '200'],
+        'code': ['derived_metrics.py', 'rate_panel.py', 'instrumentation.py'],
+        'inputs': ['data/raw/fdic', 'data/raw/rates/fred_data.csv', 'data/processed/institution_details.csv'],
+        'outputs': ['data/processed/bank_data_rank200.csv'],
+    },
+]
+
+def file_sha256(file_path, hash_cache):
+    """
+    Hash a file's content, reusing the cached hash while its size and modification time are unchanged.
+
+    Args:
+    file_path (str): Path to the file.
+    hash_cache (dict): Path -> [size, mtime_ns, sha256], updated in place.
+
+    Returns:
+    str: Hex digest of the file content.
+    """
+    stat = os.stat(file_path)
+    cached = hash_cache.get(file_path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    hash_cache[file_path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return digest.hexdigest()
+
+def path_sha256(path, hash_cache):
+    """
+    Hash a file, or every file under a directory, by content.
+
+    Args:
+    path (str): Path to the file or directory.
+    hash_cache (dict): Path -> [size, mtime_ns, sha256], updated in place.
+
+    Returns:
+    str: Hex digest, or None if the path does not exist.
+    """
+    if os.path.isfile(path):
+        return file_sha256(path, hash_cache)
+    if not os.path.isdir(path):
+        return None
+
+    digest = hashlib.sha256()
+    for dir_path, dir_names, file_names in os.walk(path):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            file_path = os.path.join(dir_path, file_name)
+            digest.update(f'{os.path.relpath(file_path, path)}:{file_sha256(file_path, hash_cache)}\n'.encode())
+    return digest.hexdigest()
+
+def stage_key(stage, hash_cache):
+    """
+    Compute a stage's cache key from its code, arguments and input contents.
+
+    Args:
+    stage (dict): Stage definition.
+    hash_cache (dict): Path -> [size, mtime_ns, sha256], updated in place.
+
+    Returns:
+    str: Hex digest identifying this exact stage run.
+    """
+    key = {
+        'code': {name: path_sha256(os.path.join(SCRIPT_DIR, name), hash_cache) for name in [stage['script']] + stage.get('code', [])},
+        'args': stage.get('args', []),
+        'inputs': {path: path_sha256(path, hash_cache) for path in stage['inputs']},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def paths_overlap(a, b):
+    """
+    Check whether two paths are the same, or one is inside the other.
+    """
+    a, b = os.path.normpath(a), os.path.normpath(b)
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+def check_outputs(stages):
+    """
+    Reject stages that write the same path, as they could run concurrently and overwrite each other's output.
+
+    Args:
+    stages (list): Stage definitions.
+
+    Raises:
+    ValueError: If two stages declare the same output path, or one inside the other.
+    """
+    for i, stage in enumerate(stages):
+        for other in stages[i + 1:]:
+            for output in stage['outputs']:
+                for other_output in other['outputs']:
+                    if paths_overlap(output, other_output):
+                        raise ValueError(f"Stages {stage['name']} and {other['name']} both write {output}")
+
+def get_dependencies(stages):
+    """
+    Find the stages each stage depends on: those producing one of its inputs, or a path containing or inside it.
+
+    Args:
+    stages (list): Stage definitions.
+
+    Returns:
+    dict: Stage name -> set of stage names it depends on.
+    """
+    return {
+        stage['name']: {
+            other['name'] for other in stages
+            if other['name'] != stage['name'] and any(paths_overlap(path, output) for path in stage['inputs'] for output in other['outputs'])
+        }
+        for stage in stages
+    }
+
+def run_stage(stage):
+    """
+    Run a stage's script from the repository root, prefixing its output with the stage name.
+
+    Args:
+    stage (dict): Stage definition.
+
+    Returns:
+    int: The script's exit code.
+    """
+    command = [sys.executable, os.path.join(SCRIPT_DIR, stage['script'])] + stage.get('args', [])
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    for line in process.stdout:
+        print(f"[{stage['name']}] {line}", end='', flush=True)
+    return process.wait()
+
+def run_pipeline(stages=STAGES, force=(), refresh=False, dry_run=False, max_workers=2, state_path=PIPELINE_STATE_PATH):
+    """
+    Run the pipeline, skipping stages whose inputs, code and arguments are unchanged since their last successful run.
+
+    Stages run as soon as the stages they depend on finish, so independent stages run concurrently.
+
+    Args:
+    stages (list): Stage definitions.
+    force (iterable): Names of stages to run regardless of the cache.
+    refresh (bool): Rerun external (download) stages.
+    dry_run (bool): Only print what would run.
+    max_workers (int): Maximum number of stages running at once.
+    state_path (str): Path to the cache state file.
+
+    Returns:
+    dict: Stage name -> 'ran', 'skipped', 'failed' or 'blocked'.
+    """
+    check_outputs(stages)
+    state = {'stages': {}, 'hashes': {}}
+    if os.path.isfile(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+
+    stages_by_name = {stage['name']: stage for stage in stages}
+    dependencies = get_dependencies(stages)
+    results = {}
+
+    def plan(stage):
+        # Decide, once the stage's dependencies are done, whether it needs to run
+        key = stage_key(stage, state['hashes'])
+        outputs_exist = all(os.path.exists(path) for path in stage['outputs'])
+        if stage['name'] in force or not outputs_exist or (refresh and stage.get('external')):
+            return 'run', key
+        if stage.get('external') or state['stages'].get(stage['name']) == key:
+            return 'skipped', key
+        return 'run', key
+
+    pending = set(stages_by_name)
+    running = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for name in sorted(pending):
+                if not dependencies[name] <= set(results):
+                    continue
+                pending.discard(name)
+                if any(results[dependency] in ('failed', 'blocked') for dependency in dependencies[name]):
+                    results[name] = 'blocked'
+                    print(f"[{name}] blocked")
+                    continue
+
+                decision, key = plan(stages_by_name[name])
+                if dry_run and any(results[dependency] == 'would run' for dependency in dependencies[name]):
+                    decision = 'run'
+                if decision != 'run' or dry_run:
+                    results[name] = 'would run' if dry_run and decision == 'run' else decision
+                    print(f"[{name}] {results[name]}")
+                    continue
+                print(f"[{name}] running {stages_by_name[name]['script']}")
+                running[executor.submit(run_stage, stages_by_name[name])] = (name, key)
+
+            if not running:
+                if pending and not any(dependencies[name] <= set(results) for name in pending):
+                    raise ValueError(f"Stages {sorted(pending)} have circular dependencies")
+                continue
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                name, key = running.pop(future)
+                if future.result() == 0:
+                    results[name] = 'ran'
+                    # Outputs are hashed on the next run, when they are inputs of a later stage
+                    state['stages'][name] = key
+                else:
+                    results[name] = 'failed'
+                    state['stages'].pop(name, None)
+                print(f"[{name}] {results[name]}")
+
+    if not dry_run:
+        os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+        with open(state_path, 'w') as f:
+            json.dump(state, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the data pipeline, skipping stages whose inputs are unchanged.")
+    parser.add_argument('--force', nargs='+', default=[], choices=[stage['name'] for stage in STAGES], help='Stages to run regardless of the cache')
+    parser.add_argument('--refresh', action='store_true', help='Rerun the FDIC and FRED downloads')
+    parser.add_argument('--dry-run', action='store_true', help='Only print what would run')
+    parser.add_argument('--jobs', type=int, default=2, help='Maximum number of stages running at once')
+    args = parser.parse_args()
+
+    os.chdir(REPO_PATH)
+    results = run_pipeline(STAGES, args.force, args.refresh, args.dry_run, args.jobs)
+    sys.exit(1 if any(result in ('failed', 'blocked') for result in results.values()) else 0)
@@ -1,10 +1,10 @@
 import os
 import pandas as pd
 from collections import defaultdict
-import time
 
 # Import functions from dataDownload_fdic.py
 from dataDownload_fdic import get_all_report_dates, get_certs_by_date, build_dataframe_for_date
+from instrumentation import ProgressTracker, finish_run, stage, start_run
 
 # Define paths
 FDIC_DATA_PATH = './data/raw/fdic'
@@ -26,13 +26,10 @@ def get_best_ranks(fdic_data_path):
 
     # Get the list of all CSV files
     files = [file for file in os.listdir(fdic_data_path) if file.endswith('.csv')]
-    total_files = len(files)
-
-    start_time = time.time()
+    progress = ProgressTracker('Analyzing FDIC files', len(files))
 
     # Iterate through each CSV file in the fdic data directory
     for i, file_name in enumerate(files, start=1):
-        print(f"Analyzing file {i} out of {total_files}; expected time remaining: {int((time.time() - start_time) / i * (total_files - i))} seconds...")
         file_path = os.path.join(fdic_data_path, file_name)
         df = pd.read_csv(file_path)
 
@@ -50,6 +47,8 @@ def get_best_ranks(fdic_data_path):
             if rank < best_ranks[cert][0]:
                 best_ranks[cert] = (rank, value, file_name, None)
 
+        progress.update(i, len(asset_data))
+
     # Convert the best ranks dictionary to a DataFrame
     best_ranks_df = pd.DataFrame.from_dict(best_ranks, orient='index', columns=['Best_Asset_Rank', 'Asset_Value', 'Filename', 'Institution_Name']).reset_index()
     best_ranks_df.rename(columns={'index': 'Cert'}, inplace=True)
@@ -98,14 +97,20 @@ def save_best_ranks(best_ranks_df, output_file_path):
     print(f"Best asset ranks with institution names saved to {output_file_path}")
 
 if __name__ == "__main__":
+    start_run('processFDIC_RankAssets')
+
     # Calculate the best ranks for each Cert
-    best_ranks_df = get_best_ranks(FDIC_DATA_PATH)
+    with stage('get_best_ranks') as record:
+        best_ranks_df = get_best_ranks(FDIC_DATA_PATH)
+        record['rows'] = len(best_ranks_df)
 
     # Update institution names
-    best_ranks_df = update_institution_names(best_ranks_df)
+    with stage('update_institution_names', rows=len(best_ranks_df)):
+        best_ranks_df = update_institution_names(best_ranks_df)
 
     # Define the output file path
     output_file_path = os.path.join(PROCESSED_DATA_PATH, 'institution_details.csv')
 
     # Save the best ranks to a CSV file
     save_best_ranks(best_ranks_df, output_file_path)
+    finish_run()
@@ -0,0 +1,186 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+FRED_DATA_PATH = './data/raw/rates/fred_data.csv'
+RATE_PANEL_PATH = './data/raw/rates/rate_panel'
+
+def load_fred_csv(fred_data_path):
+    """
+    Read the FRED data CSV file and clean every series: divide by 100, forward fill and trim to 6 decimal places.
+
+    Args:
+    fred_data_path (str): Path to the FRED data CSV file.
+
+    Returns:
+    pd.DataFrame: Daily FRED data indexed by date, one float64 column per series.
+    """
+    # Read the FRED data without specifying column names
+    fred_df = pd.read_csv(fred_data_path)
+
+    # Rename the first column to 'date'
+    fred_df.rename(columns={fred_df.columns[0]: 'date'}, inplace=True)
+
+    # Set 'date' as index and parse dates
+    fred_df['date'] = pd.to_datetime(fred_df['date'])
+    fred_df.set_index('date', inplace=True)
+    fred_df = fred_df.sort_index().astype('float64')
+
+    # Divide values by 100, forward fill each series and trim precision to 6 decimal places
+    return (fred_df / 100).ffill().round(6)
+
+def file_sha256(file_path):
+    """
+    Compute the SHA-256 hash of a file's content.
+
+    Args:
+    file_path (str): Path to the file.
+
+    Returns:
+    str: Hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def build_quarterly_alignments(daily_df):
+    """
+    Align the daily series to calendar quarter ends.
+
+    Args:
+    daily_df (pd.DataFrame): Cleaned daily FRED data indexed by date.
+
+    Returns:
+    tuple: (point-in-time DataFrame with the latest value on or before each quarter end,
+    quarter-average DataFrame with the mean daily value within each quarter), both indexed by quarter end.
+    """
+    quarter_ends = pd.date_range(daily_df.index.min() + pd.offsets.QuarterEnd(0), daily_df.index.max() + pd.offsets.QuarterEnd(0), freq='QE')
+    quarter_ends.name = 'date'
+
+    positions = daily_df.index.searchsorted(quarter_ends, side='right') - 1
+    point_df = pd.DataFrame(np.nan, index=quarter_ends, columns=daily_df.columns)
+    point_df.iloc[positions >= 0] = daily_df.to_numpy()[positions[positions >= 0]]
+
+    average_df = daily_df.groupby(daily_df.index + pd.offsets.QuarterEnd(0)).mean().reindex(quarter_ends)
+    return point_df, average_df
+
+def is_rate_panel_current(fred_data_path, panel_path):
+    """
+    Check whether the rate panel was built from the current FRED data file.
+
+    The file size and modification time are checked first; the content hash is only computed when they differ, and
+    the manifest is refreshed if the content turns out to be unchanged.
+
+    Args:
+    fred_data_path (str): Path to the FRED data CSV file.
+    panel_path (str): Path to the rate panel directory.
+
+    Returns:
+    bool: True if the panel exists and matches the FRED data file.
+    """
+    manifest_path = os.path.join(panel_path, 'manifest.json')
+    if not os.path.isfile(manifest_path):
+        return False
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    stat = os.stat(fred_data_path)
+    if manifest['source_size'] == stat.st_size and manifest['source_mtime'] == stat.st_mtime:
+        return True
+
+    if manifest['source_sha256'] != file_sha256(fred_data_path):
+        return False
+
+    manifest.update(source_size=stat.st_size, source_mtime=stat.st_mtime)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return True
+
+def build_rate_panel(fred_data_path, panel_path):
+    """
+    Build the rate panel: the cleaned daily series and their quarterly alignments, saved as .npy arrays.
+
+    Args:
+    fred_data_path (str): Path to the FRED data CSV file.
+    panel_path (str): Path to the rate panel directory.
+    """
+    daily_df = load_fred_csv(fred_data_path)
+    point_df, average_df = build_quarterly_alignments(daily_df)
+
+    os.makedirs(panel_path, exist_ok=True)
+    arrays = {
+        'daily_dates': daily_df.index.to_numpy(dtype='datetime64[D]'),
+        'daily_values': daily_df.to_numpy(dtype='float64'),
+        'quarter_dates': point_df.index.to_numpy(dtype='datetime64[D]'),
+        'quarter_point_values': point_df.to_numpy(dtype='float64'),
+        'quarter_average_values': average_df.to_numpy(dtype='float64'),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(panel_path, f'{name}.npy'), np.ascontiguousarray(array))
+
+    # Write the manifest last so an interrupted build is rebuilt on the next run
+    stat = os.stat(fred_data_path)
+    manifest = {
+        'fields': daily_df.columns.tolist(),
+        'source_sha256': file_sha256(fred_data_path),
+        'source_size': stat.st_size,
+        'source_mtime': stat.st_mtime,
+    }
+    with open(os.path.join(panel_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Rate panel with {len(daily_df)} days and {len(point_df)} quarters saved to {panel_path}")
+
+def load_rate_panel(panel_path, mmap=True):
+    """
+    Load the rate panel, memory-mapping the arrays by default.
+
+    Args:
+    panel_path (str): Path to the rate panel directory.
+    mmap (bool): Memory-map the arrays instead of reading them into memory.
+
+    Returns:
+    dict: 'daily' DataFrame of cleaned daily series indexed by date, and 'quarterly' DataFrame indexed by quarter
+    end with a point-in-time column per series and a {series}_qavg quarter-average column per series.
+    """
+    with open(os.path.join(panel_path, 'manifest.json')) as f:
+        fields = json.load(f)['fields']
+
+    def load(name):
+        return np.load(os.path.join(panel_path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+
+    daily_index = pd.DatetimeIndex(load('daily_dates').astype('datetime64[ns]'), name='date')
+    quarter_index = pd.DatetimeIndex(load('quarter_dates').astype('datetime64[ns]'), name='date')
+
+    daily_df = pd.DataFrame(load('daily_values'), index=daily_index, columns=fields, copy=False)
+    quarterly_df = pd.concat([
+        pd.DataFrame(load('quarter_point_values'), index=quarter_index, columns=fields, copy=False),
+        pd.DataFrame(load('quarter_average_values'), index=quarter_index, columns=[f'{field}_qavg' for field in fields], copy=False),
+    ], axis=1)
+
+    return {'daily': daily_df, 'quarterly': quarterly_df}
+
+def prepare_rate_panel(fred_data_path=FRED_DATA_PATH, panel_path=None):
+    """
+    Load the rate panel, rebuilding it first if the FRED data file has changed.
+
+    Args:
+    fred_data_path (str): Path to the FRED data CSV file.
+    panel_path (str): Path to the rate panel directory; defaults to a rate_panel directory next to the FRED data file.
+
+    Returns:
+    dict: Rate panel returned by load_rate_panel.
+    """
+    if panel_path is None:
+        panel_path = os.path.join(os.path.dirname(fred_data_path), 'rate_panel')
+    if not is_rate_panel_current(fred_data_path, panel_path):
+        build_rate_panel(fred_data_path, panel_path)
+    return load_rate_panel(panel_path)
+
+if __name__ == "__main__":
+    panel = prepare_rate_panel(FRED_DATA_PATH, RATE_PANEL_PATH)
+    print(panel['quarterly'].tail())
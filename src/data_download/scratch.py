@@ -1,5 +1,7 @@
 import pandas as pd
 
+from derived_metrics import compute_derived_metrics
+
 # Define paths
 PROCESSED_DATA_PATH = './data/processed/bank_data_rank200_unsorted.csv'
 OUTPUT_SORTED_PATH = './data/processed/bank_data_rank200.csv'
@@ -14,11 +16,7 @@ def calculate_deposit_expense(df):
     Returns:
     pd.DataFrame: DataFrame with the deposit expense calculated.
     """
-    df['deposit_expense'] = df.apply(
-        lambda row: row['annualized_EDEPDOM'] / row['DEPDOM'] if pd.notnull(row['annualized_EDEPDOM']) and pd.notnull(row['DEPDOM']) and row['DEPDOM'] != 0 else None,
-        axis=1
-    )
-    return df
+    return compute_derived_metrics(df, [{'name': 'deposit_expense', 'numerator': 'annualized_EDEPDOM', 'denominator': 'DEPDOM'}])
 
 def main():
     # Load the processed data
@@ -80,5 +80,14 @@ def get_model():
     logging.debug(f"Received response from backend: {response.json()}")
     return jsonify(response.json())
 
+@app.route('/get_models', methods=['POST'])
+def get_models():
+    # Batch of banks in one backend call: {'certs': [...]} or {'rank_range': [min, max]} or {'peer_group': name}, plus 'model'
+    data = request.get_json()
+    logging.debug(f"Sending batch request to backend: {data}")
+
+    response = requests.post('http://backend:8000/process_batch', json=data)
+    return jsonify(response.json()), response.status_code
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8080, debug=True)
@@ -1,6 +1,9 @@
 import pandas as pd
+import numpy as np
 import argparse
-from fuzzywuzzy import process
+import pickle
+from collections import defaultdict
+from fuzzywuzzy import process, utils
 import os
 
 # Get the directory of the current script
@@ -9,6 +12,9 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 # Define the path to the CSV file relative to the script directory
 CSV_FILE_PATH = os.path.join(script_dir, '../data/processed/institution_details.csv')
 
+# Define the path to the persistent search index built from the CSV file
+INDEX_FILE_PATH = os.path.join(script_dir, '../data/processed/institution_index.pkl')
+
 def load_data(file_path):
     """
     Load the data from the CSV file.
@@ -40,16 +46,216 @@ def fuzzy_search(df, query, column='Institution_Name', threshold=80):
     matched_values = [match[0] for match in matches]
     return df[df[column].isin(matched_values)]
 
+def get_trigrams(text):
+    """
+    Split a name into the set of character trigrams used by the search index.
+    
+    Args:
+    text (str): The name to split.
+    
+    Returns:
+    set: Set of trigrams of the normalized, space-padded name.
+    """
+    normalized = " ".join(utils.full_process(str(text)).split())
+    if not normalized:
+        return set()
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_index(df, column='Institution_Name'):
+    """
+    Build a trigram inverted index over the specified column.
+    
+    Args:
+    df (pd.DataFrame): DataFrame containing the data.
+    column (str): The column to index.
+    
+    Returns:
+    dict: Index holding the data, the indexed column and a trigram -> row positions mapping.
+    """
+    df = df.reset_index(drop=True)
+    names = df[column].fillna('').astype(str).tolist()
+
+    postings = defaultdict(list)
+    for position, name in enumerate(names):
+        for trigram in get_trigrams(name):
+            postings[trigram].append(position)
+
+    return {
+        'data': df,
+        'column': column,
+        'names': names,
+        'trigram_counts': np.array([len(get_trigrams(name)) for name in names], dtype=np.int32),
+        'postings': {trigram: np.array(positions, dtype=np.int32) for trigram, positions in postings.items()},
+    }
+
+def save_index(index, index_path, source_path=None):
+    """
+    Save the search index to disk, recording the modification time of the source CSV file.
+    
+    Args:
+    index (dict): Index returned by build_index.
+    index_path (str): Path to save the index to.
+    source_path (str): Path to the CSV file the index was built from.
+    """
+    index['source_mtime'] = os.path.getmtime(source_path) if source_path else None
+    with open(index_path, 'wb') as index_file:
+        pickle.dump(index, index_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_index(index_path, source_path):
+    """
+    Load the search index, rebuilding it if it is missing or older than the source CSV file.
+    
+    Args:
+    index_path (str): Path to the saved index.
+    source_path (str): Path to the CSV file the index is built from.
+    
+    Returns:
+    dict: The search index.
+    """
+    if os.path.isfile(index_path):
+        with open(index_path, 'rb') as index_file:
+            index = pickle.load(index_file)
+        if index.get('source_mtime') == os.path.getmtime(source_path):
+            return index
+
+    index = build_index(load_data(source_path))
+    save_index(index, index_path, source_path)
+    return index
+
+def get_candidates(index, query, max_candidates=30):
+    """
+    Select the rows containing the largest share of the query's trigrams.
+
+    Ranking by containment rather than a symmetric similarity keeps long names that include a short query, which
+    WRatio's partial matching scores highly.
+    
+    Args:
+    index (dict): Index returned by build_index.
+    query (str): The search string.
+    max_candidates (int): Maximum number of rows to keep for full scoring.
+    
+    Returns:
+    np.ndarray: Row positions of the candidate matches.
+    """
+    query_trigrams = get_trigrams(query)
+    trigram_postings = [index['postings'][trigram] for trigram in query_trigrams if trigram in index['postings']]
+    if not trigram_postings:
+        return np.array([], dtype=np.int32)
+
+    overlap = np.bincount(np.concatenate(trigram_postings), minlength=len(index['names']))
+    candidates = np.flatnonzero(overlap)
+    if len(candidates) > max_candidates:
+        # Shares of the query's trigrams found in each name; shorter names break ties
+        containment = overlap[candidates] / len(query_trigrams) - index['trigram_counts'][candidates] * 1e-6
+        top = np.argpartition(containment, -max_candidates)[-max_candidates:]
+        candidates = candidates[top]
+    return candidates
+
+def score_candidates(index, query, threshold=80, limit=10, max_candidates=30):
+    """
+    Score the candidate rows for a query with the same scorer as fuzzy_search.
+    
+    Args:
+    index (dict): Index returned by build_index.
+    query (str): The search string.
+    threshold (int): The matching threshold (0-100).
+    limit (int): Maximum number of matches to return.
+    max_candidates (int): Maximum number of rows to keep for full scoring.
+    
+    Returns:
+    list: (row position, score) tuples for the matches, best match first.
+    """
+    candidates = get_candidates(index, query, max_candidates)
+    if len(candidates) == 0:
+        return []
+    choices = {position: index['names'][position] for position in candidates}
+    matches = process.extract(query, choices, limit=limit)
+    return [(match[2], match[1]) for match in matches if match[1] >= threshold]
+
+def indexed_search(index, query, threshold=80, limit=10, max_candidates=30):
+    """
+    Perform a fuzzy search using the trigram index to prune candidates before full scoring.
+    
+    Args:
+    index (dict): Index returned by build_index.
+    query (str): The search string.
+    threshold (int): The matching threshold (0-100).
+    limit (int): Maximum number of matches to return.
+    max_candidates (int): Maximum number of rows to keep for full scoring.
+    
+    Returns:
+    pd.DataFrame: DataFrame containing the matched rows, best match first, with a Score column.
+    """
+    matches = score_candidates(index, query, threshold, limit, max_candidates)
+    results = index['data'].iloc[[position for position, _ in matches]].copy()
+    results['Score'] = [score for _, score in matches]
+    return results
+
+def resolve_names(index, names, threshold=80, max_candidates=30):
+    """
+    Resolve a list of names to their best matching institution.
+    
+    Args:
+    index (dict): Index returned by build_index.
+    names (list): Names to resolve.
+    threshold (int): The matching threshold (0-100).
+    max_candidates (int): Maximum number of rows to keep for full scoring.
+    
+    Returns:
+    pd.DataFrame: One row per name with the Query, the matched Institution_Name and Cert, and the Score.
+    """
+    best_matches = {}
+    for name in names:
+        if name not in best_matches:
+            matches = score_candidates(index, name, threshold, limit=1, max_candidates=max_candidates)
+            best_matches[name] = matches[0] if matches else (None, None)
+
+    data = index['data']
+    rows = []
+    for name in names:
+        position, score = best_matches[name]
+        if position is None:
+            rows.append((name, None, None, None))
+        else:
+            rows.append((name, index['names'][position], data['Cert'].iat[position], score))
+
+    return pd.DataFrame(rows, columns=['Query', index['column'], 'Cert', 'Score'])
+
 def main():
     parser = argparse.ArgumentParser(description="Fuzzy search for institution names.")
-    parser.add_argument('query', type=str, help='The search string')
+    parser.add_argument('query', type=str, nargs='?', help='The search string')
+    parser.add_argument('--build-index', action='store_true', help='Rebuild the search index from the CSV file')
+    parser.add_argument('--batch', type=str, help='File with one name per line to resolve in one run')
+    parser.add_argument('--output', type=str, help='CSV file to write batch results to (default: print)')
+    parser.add_argument('--threshold', type=int, default=80, help='The matching threshold (0-100)')
     args = parser.parse_args()
 
-    # Load data
-    df = load_data(CSV_FILE_PATH)
+    if args.build_index:
+        index = build_index(load_data(CSV_FILE_PATH))
+        save_index(index, INDEX_FILE_PATH, CSV_FILE_PATH)
+        print(f"Search index with {len(index['names'])} names saved to {INDEX_FILE_PATH}")
+        if not args.query and not args.batch:
+            return
+    elif not args.query and not args.batch:
+        parser.error("a query, --batch or --build-index is required")
+
+    # Load the search index, rebuilding it if the CSV file changed
+    index = load_index(INDEX_FILE_PATH, CSV_FILE_PATH)
+
+    if args.batch:
+        with open(args.batch) as batch_file:
+            names = [line.strip() for line in batch_file if line.strip()]
+        results = resolve_names(index, names, args.threshold)
+        if args.output:
+            results.to_csv(args.output, index=False)
+            print(f"Resolved {results['Cert'].notnull().sum()} of {len(results)} names; results saved to {args.output}")
+        else:
+            print(results.to_string(index=False))
+        return
 
     # Perform fuzzy search
-    results = fuzzy_search(df, args.query)
+    results = indexed_search(index, args.query, args.threshold)
 
     # Print results
     if results.empty:
@@ -0,0 +1,8 @@
+import os
+import sys
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# The data_download scripts and the backend modules import each other as top-level modules, as they do when run directly.
+sys.path.insert(0, os.path.join(SRC_PATH, 'data_download'))
+sys.path.insert(0, os.path.join(SRC_PATH, 'backend'))
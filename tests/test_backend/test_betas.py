@@ -0,0 +1,120 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from botocore.exceptions import ClientError
+from sklearn.linear_model import LinearRegression
+from betas import find_certs, fit_all_banks, select_results
+from dataset import SharedDataset, build_dataset, load_dataset
+
+class TestBetas(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        dates = pd.date_range('2015-03-31', periods=20, freq='QE')
+        ff_t = rng.uniform(0, 0.05, len(dates))
+        frames = []
+        for cert, beta in [(5, 0.3), (11, 0.6), (40, 0.1)]:
+            rate = 0.002 + beta * ff_t + rng.normal(0, 0.001, len(dates))
+            frames.append(pd.DataFrame({'date': dates, 'cert': cert, 'ff_t': ff_t, 'deposit_expense_rate': rate}))
+        self.df = pd.concat(frames, ignore_index=True)
+        self.df.loc[3, 'deposit_expense_rate'] = np.nan
+        # A bank with a single quarter cannot be fitted
+        self.df = pd.concat([self.df, pd.DataFrame({'date': [dates[0]], 'cert': [77], 'ff_t': [0.01], 'deposit_expense_rate': [0.004]})], ignore_index=True)
+        self.csv_path = os.path.join(self.tmp_dir, 'bank_data_rank200.csv')
+        self.df.sample(frac=1, random_state=0).to_csv(self.csv_path, index=False)
+        self.dataset_path = os.path.join(self.tmp_dir, 'dataset')
+        os.makedirs(self.dataset_path)
+        build_dataset(self.csv_path, self.dataset_path, 'v1')
+        self.dataset = load_dataset(self.dataset_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_linear_regression_matches_sklearn(self):
+        results = fit_all_banks(self.dataset, 'linear regression').set_index('cert')
+        for cert, bank_df in self.df.dropna().groupby('cert'):
+            model = LinearRegression().fit(bank_df[['ff_t']].values, bank_df['deposit_expense_rate'].values)
+            self.assertAlmostEqual(results.loc[cert, 'intercept'], model.intercept_, places=10)
+            self.assertAlmostEqual(results.loc[cert, 'coefficient'], model.coef_[0], places=10)
+            self.assertEqual(results.loc[cert, 'observations'], len(bank_df))
+
+    def test_error_correction_matches_lstsq(self):
+        results = fit_all_banks(self.dataset, 'error correction').set_index('cert')
+        bank_df = self.df[self.df['cert'] == 5].sort_values('date').reset_index(drop=True)
+        valid = bank_df['deposit_expense_rate'].notna()
+        long_run = LinearRegression().fit(bank_df.loc[valid, ['ff_t']].values, bank_df.loc[valid, 'deposit_expense_rate'].values)
+        deviation = bank_df['deposit_expense_rate'] - long_run.intercept_ - long_run.coef_[0] * bank_df['ff_t']
+        short_run_df = pd.DataFrame({
+            'deviation': deviation.shift(1),
+            'ff_change': bank_df['ff_t'].diff(),
+            'rate_change': bank_df['deposit_expense_rate'].diff(),
+        }).dropna()
+        X = np.column_stack([np.ones(len(short_run_df)), short_run_df[['deviation', 'ff_change']].values])
+        coefficients = np.linalg.lstsq(X, short_run_df['rate_change'].values, rcond=None)[0]
+        self.assertAlmostEqual(results.loc[5, 'adjustment_speed'], coefficients[1], places=8)
+        self.assertAlmostEqual(results.loc[5, 'short_run_coefficient'], coefficients[2], places=8)
+        self.assertEqual(results.loc[5, 'observations'], len(short_run_df))
+
+    def test_select_results(self):
+        results = fit_all_banks(self.dataset, 'linear regression')
+        selected = select_results(results, [40, 5, 123, 77], 'linear regression')
+        self.assertEqual([record['cert'] for record in selected], [40, 5, 123, 77])
+        self.assertNotIn('error', selected[0])
+        self.assertEqual(selected[0]['model_type'], 'Linear Regression')
+        self.assertEqual(selected[2]['error'], 'Cert not found in data')
+        self.assertIn('error', selected[3])
+        json.dumps(selected)
+
+    def test_find_certs(self):
+        positions, found = find_certs(np.array([3, 7, 11]), [11, 5, 3, 20])
+        self.assertEqual(found.tolist(), [True, False, True, False])
+        self.assertEqual(positions[found].tolist(), [2, 0])
+        positions, found = find_certs(np.array([], dtype='int64'), [3])
+        self.assertEqual(found.tolist(), [False])
+
+    def test_process_batch(self):
+        import app
+        peer_groups_path = os.path.join(self.tmp_dir, 'peer_groups.json')
+        with open(peer_groups_path, 'w') as f:
+            json.dump({'regional': [11, 40]}, f)
+        settings = {
+            'DATASET': SharedDataset(self.dataset_path, app.get_dataset_version, app.fetch_dataset_csv),
+            'DATASET_SOURCE_PATH': self.csv_path,
+            'PEER_GROUPS_PATH': peer_groups_path,
+        }
+
+        with mock.patch.multiple(app, **settings):
+            current_path = os.getcwd()
+            os.chdir(self.tmp_dir)  # The backend writes its request log to the working directory
+            try:
+                client = app.app.test_client()
+                response = client.post('/process_batch', json={'certs': [5, 11], 'model': 'linear regression'})
+                self.assertEqual([result['cert'] for result in response.get_json()['results']], [5, 11])
+
+                response = client.post('/process_batch', json={'peer_group': 'regional', 'model': 'error correction', 'stream': True})
+                self.assertEqual(response.mimetype, 'application/x-ndjson')
+                lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+                self.assertEqual([line['cert'] for line in lines], [11, 40])
+                self.assertEqual(lines[0]['model_type'], 'Error Correction')
+
+                self.assertEqual(client.post('/process_batch', json={'certs': [5], 'model': 'unknown'}).status_code, 400)
+                self.assertEqual(client.post('/process_batch', json={'peer_group': 'missing'}).status_code, 400)
+
+                # An S3 failure loading institution details is reported as a JSON error
+                s3_error = ClientError({'Error': {'Code': 'SlowDown', 'Message': 'Please reduce your request rate.'}}, 'GetObject')
+                with mock.patch.object(app, 'get_institution_details', side_effect=s3_error):
+                    response = client.post('/process_batch', json={'rank_range': [1, 10]})
+                self.assertEqual(response.status_code, 500)
+                self.assertIn('SlowDown', response.get_json()['error'])
+            finally:
+                os.chdir(current_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
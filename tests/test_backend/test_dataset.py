@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from dataset import build_dataset, ensure_dataset, get_bank_rows, get_current_version, load_dataset, SharedDataset
+
+class TestDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmp_dir, 'bank_data_rank200.csv')
+        self.dataset_path = os.path.join(self.tmp_dir, 'dataset')
+        os.makedirs(self.dataset_path)
+        self.df = pd.DataFrame({
+            'date': ['2020-06-30', '2020-03-31', '2020-03-31', '2020-06-30', '2020-03-31'],
+            'cert': ['7', '7', 'Aggregated_Small_Banks', '3', '3'],
+            'deposit_expense_rate': [0.02, 0.01, 0.03, 0.015, np.nan],
+            'ff_t': [0.001, 0.015, 0.015, 0.001, 0.015],
+        })
+        self.df.to_csv(self.csv_path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_bank_rows(self):
+        build_dataset(self.csv_path, self.dataset_path, 'v1')
+        dataset = load_dataset(self.dataset_path)
+        self.assertEqual(dataset['rows'], 5)
+
+        bank_df = get_bank_rows(dataset, 7)
+        self.assertEqual(bank_df['date'].tolist(), [pd.Timestamp('2020-03-31'), pd.Timestamp('2020-06-30')])
+        self.assertEqual(bank_df['deposit_expense_rate'].tolist(), [0.01, 0.02])
+        self.assertEqual(get_bank_rows(dataset, -1)['deposit_expense_rate'].tolist(), [0.03])
+        self.assertTrue(np.isnan(get_bank_rows(dataset, 3)['deposit_expense_rate'].iloc[0]))
+        self.assertTrue(get_bank_rows(dataset, 5).empty)
+        self.assertTrue(get_bank_rows(dataset, 99).empty)
+
+    def test_yyyymmdd_dates(self):
+        self.df['date'] = pd.to_datetime(self.df['date']).dt.strftime('%Y%m%d').astype(int)
+        self.df.to_csv(self.csv_path, index=False)
+        build_dataset(self.csv_path, self.dataset_path, 'v1')
+        bank_df = get_bank_rows(load_dataset(self.dataset_path), 3)
+        self.assertEqual(bank_df['date'].tolist(), [pd.Timestamp('2020-03-31'), pd.Timestamp('2020-06-30')])
+
+    def test_version_switch(self):
+        versions = iter(['v1', 'v1', 'v2'])
+        fetches = []
+
+        def fetch_csv(destination_path):
+            fetches.append(destination_path)
+            shutil.copyfile(self.csv_path, destination_path)
+
+        shared = SharedDataset(self.dataset_path, lambda: next(versions), fetch_csv, refresh_seconds=0)
+        self.assertEqual(shared.get()['version'], 'v1')
+        self.assertEqual(shared.get()['version'], 'v1')
+        self.assertEqual(len(fetches), 1)
+
+        self.df.loc[0, 'deposit_expense_rate'] = 0.05
+        self.df.to_csv(self.csv_path, index=False)
+        dataset = shared.get()
+        self.assertEqual(dataset['version'], 'v2')
+        self.assertEqual(get_bank_rows(dataset, 7)['deposit_expense_rate'].tolist(), [0.01, 0.05])
+        self.assertEqual(get_current_version(self.dataset_path), 'v2')
+
+        # A version that is already current is not rebuilt
+        self.assertFalse(ensure_dataset(self.dataset_path, 'v2', fetch_csv))
+        self.assertEqual(len(fetches), 2)
+
+    def test_refresh_failure_keeps_loaded_version(self):
+        calls = []
+
+        def get_version():
+            calls.append(len(calls))
+            if len(calls) > 1:
+                raise ConnectionError('S3 unavailable')
+            return 'v1'
+
+        shared = SharedDataset(self.dataset_path, get_version, lambda destination_path: shutil.copyfile(self.csv_path, destination_path), refresh_seconds=60)
+        self.assertEqual(shared.get()['version'], 'v1')
+        shared.checked_at = 0.0
+        with self.assertLogs('dataset', level='ERROR'):
+            dataset = shared.get()
+        self.assertEqual(dataset['version'], 'v1')
+        self.assertEqual(get_bank_rows(dataset, 7)['deposit_expense_rate'].tolist(), [0.01, 0.02])
+
+        # The failed check counts as a check, so requests until the next refresh do not retry it
+        shared.get()
+        self.assertEqual(len(calls), 2)
+
+        # On a cold start the error is raised
+        cold = SharedDataset(os.path.join(self.tmp_dir, 'cold'), get_version, shutil.copyfile, refresh_seconds=0)
+        with self.assertRaises(ConnectionError):
+            cold.get()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from betas import fit_all_banks
+from dataset import SharedDataset, build_dataset, load_dataset
+from scenarios import project_scenarios
+
+class TestScenarios(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(1)
+        dates = pd.date_range('2015-03-31', periods=24, freq='QE')
+        ff_t = 0.02 + np.cumsum(rng.normal(0, 0.003, len(dates)))
+        t_10y = ff_t + 0.01
+        frames = []
+        for cert, beta in [(8, 0.4), (15, 0.7)]:
+            rate = 0.001 + beta * ff_t + rng.normal(0, 0.0005, len(dates))
+            frames.append(pd.DataFrame({'date': dates, 'cert': cert, 'ff_t': ff_t, 't_10y': t_10y, 'deposit_expense_rate': rate, 'DEPDOM': 1000.0 * cert}))
+        self.df = pd.concat(frames, ignore_index=True)
+        # The latest quarter of cert 15 is incomplete, so its projections start from the quarter before
+        self.df.loc[self.df.index[-1], 'deposit_expense_rate'] = np.nan
+        self.csv_path = os.path.join(self.tmp_dir, 'bank_data_rank200.csv')
+        self.df.to_csv(self.csv_path, index=False)
+        self.dataset_path = os.path.join(self.tmp_dir, 'dataset')
+        os.makedirs(self.dataset_path)
+        build_dataset(self.csv_path, self.dataset_path, 'v1')
+        self.dataset = load_dataset(self.dataset_path)
+        self.paths = np.array([[0.03, 0.035, 0.04], [0.01, 0.01, 0.005]])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_linear_projection(self):
+        results = fit_all_banks(self.dataset, 'linear regression', 't_10y')
+        projection = project_scenarios(self.dataset, results, 'linear regression', self.paths, 't_10y')
+        self.assertEqual(projection['deposit_expense_rate'].shape, (2, 2, 3))
+        expected = results.loc[1, 'intercept'] + results.loc[1, 'coefficient'] * self.paths[1]
+        np.testing.assert_allclose(projection['deposit_expense_rate'][1, 1], expected)
+        np.testing.assert_allclose(projection['annualized_EDEPDOM'][1, 1], expected * 15000.0)
+
+    def test_error_correction_projection(self):
+        results = fit_all_banks(self.dataset, 'error correction').set_index('cert')
+        projection = project_scenarios(self.dataset, results.reset_index(), 'error correction', self.paths, positions=np.array([1]))
+        self.assertEqual(projection['deposit_expense_rate'].shape, (1, 2, 3))
+
+        # Step the model forward one bank and one scenario at a time
+        bank = results.loc[15]
+        bank_df = self.df[self.df['cert'] == 15].dropna()
+        rate, previous_path = bank_df['deposit_expense_rate'].iloc[-1], bank_df['ff_t'].iloc[-1]
+        for quarter, path in enumerate(self.paths[0]):
+            deviation = rate - bank['intercept'] - bank['coefficient'] * previous_path
+            rate = rate + bank['short_run_intercept'] + bank['adjustment_speed'] * deviation + bank['short_run_coefficient'] * (path - previous_path)
+            previous_path = path
+            self.assertAlmostEqual(projection['deposit_expense_rate'][0, 0, quarter], rate, places=12)
+
+    def test_scenarios_endpoint(self):
+        import app
+        settings = {
+            'DATASET': SharedDataset(self.dataset_path, app.get_dataset_version, app.fetch_dataset_csv),
+            'DATASET_SOURCE_PATH': self.csv_path,
+        }
+        request = {'scenarios': [{'name': 'up', 'path': self.paths[0].tolist()}, {'name': 'down', 'path': self.paths[1].tolist()}], 'model': 'linear regression'}
+
+        with mock.patch.multiple(app, **settings):
+            current_path = os.getcwd()
+            os.chdir(self.tmp_dir)  # The backend writes its request log to the working directory
+            try:
+                client = app.app.test_client()
+                response = client.post('/scenarios', json=request).get_json()
+                self.assertEqual(response['scenarios'], ['up', 'down'])
+                self.assertEqual([bank['cert'] for bank in response['banks']], [8, 15])
+                self.assertEqual(np.array(response['banks'][0]['annualized_EDEPDOM']).shape, (2, 3))
+
+                response = client.post('/scenarios', json=dict(request, certs=[15, 99], stream=True))
+                lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+                self.assertEqual([line['cert'] for line in lines[:-1]], [15])
+                self.assertEqual(lines[-1], {'missing_certs': [99]})
+
+                for rate_field in ['t_99y', 'date', 'cert']:
+                    self.assertEqual(client.post('/scenarios', json=dict(request, rate_field=rate_field)).status_code, 400)
+                ragged = {'scenarios': [{'name': 'a', 'path': [0.01, 0.02]}, {'name': 'b', 'path': [0.01]}]}
+                self.assertEqual(client.post('/scenarios', json=ragged).status_code, 400)
+            finally:
+                os.chdir(current_path)
+
+    def test_scenarios_endpoint_with_empty_dataset(self):
+        import app
+        empty_csv_path = os.path.join(self.tmp_dir, 'empty.csv')
+        pd.read_csv(self.csv_path).head(0).to_csv(empty_csv_path, index=False)
+        settings = {
+            'DATASET': SharedDataset(os.path.join(self.tmp_dir, 'empty_dataset'), app.get_dataset_version, app.fetch_dataset_csv),
+            'DATASET_SOURCE_PATH': empty_csv_path,
+        }
+        request = {'scenarios': [{'name': 'up', 'path': self.paths[0].tolist()}], 'certs': [8, 15]}
+
+        with mock.patch.multiple(app, **settings):
+            current_path = os.getcwd()
+            os.chdir(self.tmp_dir)
+            try:
+                response = app.app.test_client().post('/scenarios', json=request)
+            finally:
+                os.chdir(current_path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['banks'], [])
+        self.assertEqual(response.get_json()['missing_certs'], [8, 15])
+
+if __name__ == '__main__':
+    unittest.main()
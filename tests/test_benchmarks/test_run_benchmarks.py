@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from benchmarks.synthetic_data import generate_dataset
+from benchmarks.run_benchmarks import check_regressions, run_benchmarks
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_synthetic_dataset(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = generate_dataset(os.path.join(tmp_dir, 'data'), n_certs=20, n_quarters=6, n_fields=16)
+            self.assertEqual(len(os.listdir(paths['fdic_data_path'])), 6)
+
+            quarter_df = pd.read_csv(os.path.join(paths['fdic_data_path'], sorted(os.listdir(paths['fdic_data_path']))[-1]))
+            self.assertEqual(list(quarter_df.columns), ['Date', 'Cert', 'Field', 'Value'])
+            self.assertEqual(quarter_df['Field'].nunique(), 16)
+
+            details_df = pd.read_csv(paths['best_ranks_path'])
+            self.assertEqual(len(details_df), 20)
+            self.assertEqual(details_df['Best_Asset_Rank'].min(), 1)
+
+    def test_run_benchmarks(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = generate_dataset(os.path.join(tmp_dir, 'data'), n_certs=30, n_quarters=5)
+            current_path = os.getcwd()
+            os.chdir(tmp_dir)
+            try:
+                results = run_benchmarks(paths, tmp_dir, repeats=1, n_queries=3)
+            finally:
+                os.chdir(current_path)
+        self.assertIn('backend./process', results)
+        self.assertTrue(all(result['seconds'] >= 0 for result in results.values()))
+
+    def test_check_regressions(self):
+        baseline = {'a': {'seconds': 1.0}, 'b': {'seconds': 1.0}}
+        results = {'a': {'seconds': 1.2}, 'b': {'seconds': 1.3}, 'c': {'seconds': 9.0}}
+        regressions = check_regressions(results, baseline, 0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('b:'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.data_download.create_modeling_table import AGGREGATED_CERT, BUCKET_CERT_BASE, STATE_LABELS, aggregate_buckets, assign_buckets, process_and_merge_data, process_and_merge_data_by_bucket, process_and_merge_data_for_thresholds, process_fdic_data, stream_modeling_table
+
+ANNUALIZE_FIELDS = ['EDEPDOM']
+NON_ANNUALIZE_FIELDS = ['DEPDOM', 'ASSET']
+FRED_FIELDS = ['ff_t', 'ff_e']
+
+class TestModelingTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = self.tmp_dir.name
+        self.fdic_path = os.path.join(root, 'fdic')
+        os.makedirs(self.fdic_path)
+
+        rng = np.random.default_rng(0)
+        for date in ['20230331', '20230630', '20230930', '20231231']:
+            rows = [
+                (date, cert, field, float(rng.integers(1, 1000)))
+                for cert in [10, 20, 30, 40]
+                for field in ANNUALIZE_FIELDS + NON_ANNUALIZE_FIELDS
+                if not (cert == 40 and date == '20230630')
+            ]
+            pd.DataFrame(rows, columns=['Date', 'Cert', 'Field', 'Value']).to_csv(os.path.join(self.fdic_path, f'{date}.csv'), index=False)
+
+        self.fred_path = os.path.join(root, 'fred_data.csv')
+        dates = pd.date_range('2022-12-01', '2024-01-31', freq='D')
+        pd.DataFrame({'ff_t': np.linspace(4, 5, len(dates)), 'ff_e': np.linspace(3, 6, len(dates))}, index=dates).to_csv(self.fred_path)
+
+        self.best_ranks_path = os.path.join(root, 'institution_details.csv')
+        pd.DataFrame({'Cert': [10, 20, 30, 40], 'Best_Asset_Rank': [1, 2, 3, 4], 'State': ['OH', 'TX', 'OH', 'TX']}).to_csv(self.best_ranks_path, index=False)
+
+        self.output_template = os.path.join(root, 'bank_data_rank{}.csv')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_stream_matches_in_memory_build(self):
+        process_and_merge_data(self.fdic_path, self.fred_path, self.best_ranks_path, self.output_template, ANNUALIZE_FIELDS, NON_ANNUALIZE_FIELDS, FRED_FIELDS, 2, 1950)
+        stream_path = self.output_template.format('stream')
+        stream_modeling_table(self.fdic_path, self.fred_path, self.best_ranks_path, stream_path, ANNUALIZE_FIELDS, NON_ANNUALIZE_FIELDS, FRED_FIELDS, 2, 1950, chunk_quarters=3)
+
+        expected = pd.read_csv(self.output_template.format(2))
+        expected['cert'] = expected['cert'].replace('Aggregated_Small_Banks', AGGREGATED_CERT).astype(int)
+        expected['date'] = pd.to_datetime(expected['date']).dt.strftime('%Y%m%d').astype(int)
+        actual = pd.read_csv(stream_path)
+
+        self.assertEqual(list(actual.columns), list(expected.columns))
+        pd.testing.assert_frame_equal(
+            actual.sort_values(['date', 'cert']).reset_index(drop=True),
+            expected.sort_values(['date', 'cert']).reset_index(drop=True),
+            check_dtype=False, rtol=1e-6,
+        )
+
+    def test_stream_all_banks(self):
+        stream_path = self.output_template.format('all')
+        stream_modeling_table(self.fdic_path, self.fred_path, self.best_ranks_path, stream_path, ANNUALIZE_FIELDS, NON_ANNUALIZE_FIELDS, FRED_FIELDS, None, 1950)
+        actual = pd.read_csv(stream_path)
+        self.assertEqual(len(actual), 15)
+        self.assertNotIn(AGGREGATED_CERT, actual['cert'].tolist())
+
+    def test_thresholds_match_single_builds(self):
+        multi_template = self.output_template.replace('rank{}', 'multi{}')
+        process_and_merge_data_for_thresholds(self.fdic_path, self.fred_path, self.best_ranks_path, multi_template, ANNUALIZE_FIELDS, NON_ANNUALIZE_FIELDS, FRED_FIELDS, [4, 1, 2], 1950)
+
+        for rank_threshold in [1, 2, 4]:
+            process_and_merge_data(self.fdic_path, self.fred_path, self.best_ranks_path, self.output_template, ANNUALIZE_FIELDS, NON_ANNUALIZE_FIELDS, FRED_FIELDS, rank_threshold, 1950)
+            pd.testing.assert_frame_equal(pd.read_csv(multi_template.format(rank_threshold)), pd.read_csv(self.output_template.format(rank_threshold)))
+
+    def test_aggregate_buckets(self):
+        df = pd.DataFrame({
+            'date': ['20230331'] * 4,
+            'cert': [1, 2, 3, 4],
+            'ASSET': [50_000.0, 80_000.0, 500_000.0, 20_000_000.0],
+            'ratio': [0.1, np.nan, 0.4, 0.2],
+        })
+        buckets = assign_buckets(df, 'asset_tier', pd.DataFrame({'Cert': []}))
+        self.assertEqual(buckets.tolist(), ['under_100m', 'under_100m', '100m_to_1b', 'over_10b'])
+
+        aggregated_df = aggregate_buckets(df, buckets, {'ratio': 'ASSET'})
+        self.assertEqual(aggregated_df['cert'].tolist(), [BUCKET_CERT_BASE, BUCKET_CERT_BASE - 1, BUCKET_CERT_BASE - 3])
+        self.assertEqual(aggregated_df['bank_count'].tolist(), [2, 1, 1])
+        self.assertEqual(aggregated_df['ASSET'].tolist(), [130_000.0, 500_000.0, 20_000_000.0])
+        # The bank without a ratio is left out of the weighted average
+        self.assertAlmostEqual(aggregated_df['ratio'].iloc[0], 0.1)
+        self.assertEqual(str(aggregated_df['cert'].dtype), 'int32')
+
+    def test_bucket_certs_are_fixed(self):
+        df = pd.DataFrame({'date': ['20230331'] * 4, 'cert': [1, 2, 3, 4], 'ASSET': [50_000.0, 80_000.0, 500_000.0, 20_000_000.0]})
+        certs = aggregate_buckets(df, assign_buckets(df, 'asset_tier', pd.DataFrame({'Cert': []})))['cert'].tolist()
+        self.assertNotIn(AGGREGATED_CERT, certs)
+
+        # A state keeps its cert whichever other states are present
+        details = pd.DataFrame({'Cert': [1, 2, 3, 4], 'State': ['WY', 'TX', 'AK', 'XX']})
+        both_df = aggregate_buckets(df, assign_buckets(df, 'State', details))
+        texas_only_df = aggregate_buckets(df[df['cert'] == 2], assign_buckets(df[df['cert'] == 2], 'State', details))
+        self.assertEqual(both_df.loc[both_df['bucket'] == 'TX', 'cert'].tolist(), texas_only_df['cert'].tolist())
+        self.assertEqual(both_df['bucket'].tolist(), ['AK', 'TX', 'WY', 'unknown'])
+        self.assertNotIn(AGGREGATED_CERT, both_df['cert'].tolist())
+        self.assertTrue((both_df['cert'] <= BUCKET_CERT_BASE).all())
+
+    def test_bucketed_build(self):
+        output_path = self.output_template.format('1_State')
+        process_and_merge_data_by_bucket(self.fdic_path, self.fred_path, self.best_ranks_path, output_path, ANNUALIZE_FIELDS, NON_ANNUALIZE_FIELDS, FRED_FIELDS, 1, 1950, 'State')
+        actual = pd.read_csv(output_path)
+        banks = process_fdic_data(self.fdic_path, ANNUALIZE_FIELDS, NON_ANNUALIZE_FIELDS, 1950)
+
+        texas_cert = BUCKET_CERT_BASE - STATE_LABELS.index('TX')
+        self.assertEqual(sorted(actual['cert'].unique().tolist()), [texas_cert, BUCKET_CERT_BASE - STATE_LABELS.index('OH'), 10])
+        self.assertEqual(actual.loc[actual['cert'] == 10, 'bucket'].unique().tolist(), ['OH'])
+        texas_df = actual[actual['cert'] == texas_cert]
+        self.assertEqual(texas_df['bucket'].unique().tolist(), ['TX'])
+        self.assertEqual(texas_df['bank_count'].tolist(), [2, 1, 2, 2])
+        expected_deposits = banks[banks['cert'].isin([20, 40])].groupby('date')['DEPDOM'].sum().tolist()
+        self.assertEqual(texas_df['DEPDOM'].tolist(), expected_deposits)
+        np.testing.assert_allclose(texas_df['deposit_expense_rate'], texas_df['annualized_EDEPDOM'] / texas_df['DEPDOM'])
+
+        # Deposit-weighted bank ratios match the ratio of the bucket totals
+        weighted_path = self.output_template.format('1_State_weighted')
+        process_and_merge_data_by_bucket(self.fdic_path, self.fred_path, self.best_ranks_path, weighted_path, ANNUALIZE_FIELDS, NON_ANNUALIZE_FIELDS, FRED_FIELDS, 1, 1950, 'State', 'DEPDOM')
+        weighted = pd.read_csv(weighted_path)
+        np.testing.assert_allclose(weighted.loc[weighted['cert'] == texas_cert, 'deposit_expense_rate'], texas_df['deposit_expense_rate'])
+
+if __name__ == "__main__":
+    unittest.main()
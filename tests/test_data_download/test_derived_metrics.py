@@ -0,0 +1,30 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.data_download.derived_metrics import MODELING_TABLE_METRICS, compute_derived_metrics
+
+class TestDerivedMetrics(unittest.TestCase):
+
+    def test_matches_row_wise_ratio(self):
+        df = pd.DataFrame({
+            'DEPINS': [50.0, None, 10.0, 3.0],
+            'DEPDOM': [100.0, 100.0, 0.0, 4.0],
+            'annualized_EDEPDOM': pd.Series([2.0, 1.0, 1.0, None], dtype=object),
+        })
+        result = compute_derived_metrics(df, MODELING_TABLE_METRICS)
+
+        expected = df.apply(
+            lambda row: row['DEPINS'] / row['DEPDOM'] if pd.notnull(row['DEPINS']) and pd.notnull(row['DEPDOM']) and row['DEPDOM'] != 0 else None, axis=1
+        )
+        np.testing.assert_allclose(result['insured_deposit_percentage'], expected.astype(float))
+        np.testing.assert_allclose(result['deposit_expense_rate'], [0.02, 0.01, np.nan, np.nan])
+        self.assertNotIn('securities_asset_percentage', result.columns)
+
+    def test_null_and_zero_values(self):
+        df = pd.DataFrame({'num': [1.0, None, 1.0], 'den': [2.0, 2.0, 0.0]})
+        metric = {'name': 'ratio', 'numerator': 'num', 'denominator': 'den', 'null_value': 0.0, 'zero_value': -1.0}
+        result = compute_derived_metrics(df, [metric])
+        self.assertEqual(result['ratio'].tolist(), [0.5, 0.0, -1.0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from src.data_download.fdic_cert_index import get_cert_history, index_quarter_file, load_cert_index, update_cert_index
+
+FIELDS = ['DEPDOM', 'EDEPDOM', 'ASSET']
+
+class TestCertIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fdic_path = os.path.join(self.tmp_dir.name, 'fdic')
+        self.index_path = os.path.join(self.tmp_dir.name, 'fdic_index')
+        os.makedirs(self.fdic_path)
+        for quarter, date in enumerate(['20230331', '20230630', '20230930']):
+            self.write_quarter(date, [20, 10, 30], quarter)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_quarter(self, date, certs, quarter):
+        rows = [(date, cert, field, cert * 100 + quarter * 10 + i) for cert in certs for i, field in enumerate(FIELDS)]
+        pd.DataFrame(rows, columns=['Date', 'Cert', 'Field', 'Value']).to_csv(os.path.join(self.fdic_path, f'{date}.csv'), index=False)
+
+    def read_all(self, cert):
+        files = sorted(os.listdir(self.fdic_path))
+        all_df = pd.concat([pd.read_csv(os.path.join(self.fdic_path, file_name), dtype={'Date': str}) for file_name in files])
+        return all_df[all_df['Cert'] == cert].reset_index(drop=True)
+
+    def test_index_quarter_file(self):
+        file_path = os.path.join(self.fdic_path, 'split.csv')
+        pd.DataFrame({'Date': ['20230331'] * 4, 'Cert': [10, 10, 20, 10], 'Field': ['A', 'B', 'A', 'C'], 'Value': [1, 2, 3, 4]}).to_csv(file_path, index=False)
+        certs, starts, ends = index_quarter_file(file_path)
+        self.assertEqual(certs.tolist(), [10, 20, 10])
+
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        self.assertEqual([data[start:end].decode().splitlines() for start, end in zip(starts, ends)], [
+            ['20230331,10,A,1', '20230331,10,B,2'],
+            ['20230331,20,A,3'],
+            ['20230331,10,C,4'],
+        ])
+
+    def test_get_cert_history(self):
+        update_cert_index(self.fdic_path, self.index_path)
+        for cert in [10, 20, 30]:
+            history_df = get_cert_history(cert, fdic_data_path=self.fdic_path, index_path=self.index_path)
+            pd.testing.assert_frame_equal(history_df, self.read_all(cert))
+
+        history_df = get_cert_history(10, ['ASSET'], fdic_data_path=self.fdic_path, index_path=self.index_path)
+        self.assertEqual(history_df['Date'].tolist(), ['20230331', '20230630', '20230930'])
+        self.assertEqual(history_df['Value'].tolist(), [1002, 1012, 1022])
+        self.assertTrue(get_cert_history(99, fdic_data_path=self.fdic_path, index_path=self.index_path).empty)
+
+    def test_incremental_update(self):
+        self.assertEqual(update_cert_index(self.fdic_path, self.index_path), 3)
+        self.assertEqual(update_cert_index(self.fdic_path, self.index_path), 0)
+
+        # A new quarter is indexed on its own, and a bank first reported in it is found
+        self.write_quarter('20231231', [10, 40], 3)
+        self.assertEqual(update_cert_index(self.fdic_path, self.index_path), 1)
+        self.assertEqual(len(load_cert_index(self.index_path)['files']), 4)
+        pd.testing.assert_frame_equal(get_cert_history(40, fdic_data_path=self.fdic_path, index_path=self.index_path), self.read_all(40))
+
+        # A rewritten quarter is picked up by the query without an explicit update
+        self.write_quarter('20230630', [30], 1)
+        pd.testing.assert_frame_equal(get_cert_history(10, fdic_data_path=self.fdic_path, index_path=self.index_path), self.read_all(10))
+        self.assertEqual(update_cert_index(self.fdic_path, self.index_path), 0)
+
+if __name__ == "__main__":
+    unittest.main()
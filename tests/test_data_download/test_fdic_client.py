@@ -0,0 +1,142 @@
+import os
+import re
+import asyncio
+import datetime
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+import requests
+from src.data_download import fdic_client
+from src.data_download.fdic_client import FDICClient, download_quarters, get_certs, get_quarter_ends, get_report_dates, stream_quarter_rows
+
+REPORT_DATES = ['20230331', '20230630', '20230930']
+
+class FakeResponse:
+
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} error', response=self)
+
+    def json(self):
+        return self.data
+
+class FakeSession:
+    """Answers financials queries like the FDIC API, from an in-memory list of filings."""
+
+    def __init__(self, filings, errors=None):
+        self.filings = filings
+        self.requests = []
+        # Report date -> status codes to answer its next requests with
+        self.errors = errors or {}
+
+    def get(self, url, params, timeout):
+        self.requests.append(params)
+        report_date = re.search(r'REPDTE:(\d+)', params['filters']).group(1)
+        if self.errors.get(report_date):
+            return FakeResponse({}, self.errors[report_date].pop(0))
+        certs = {int(cert) for cert in re.findall(r'CERT:(\d+)', params['filters'])}
+        matches = [filing for filing in self.filings if filing['REPDTE'] == report_date and (not certs or filing['CERT'] in certs)]
+        matches.sort(key=lambda filing: filing['CERT'])
+        fields = params['fields'].split(',')
+        page = matches[params['offset']:params['offset'] + params['limit']]
+        return FakeResponse({
+            'meta': {'total': len(matches)},
+            'data': [{'data': {field: filing[field] for field in fields if field in filing}} for filing in page],
+        })
+
+class TestFDICClient(unittest.TestCase):
+
+    def setUp(self):
+        # 23 banks per quarter, one of which does not report ASSET
+        self.filings = [
+            {'REPDTE': date, 'CERT': cert, 'ASSET': cert * 10 + quarter, 'DEPDOM': cert + quarter * 0.5}
+            for quarter, date in enumerate(REPORT_DATES)
+            for cert in range(100, 123)
+        ]
+        del self.filings[5]['ASSET']
+        self.session = FakeSession(self.filings)
+
+    def client(self):
+        return FDICClient(page_size=5, max_concurrency=2, session=self.session)
+
+    def test_paginate(self):
+        certs = asyncio.run(get_certs(self.client(), '20230630'))
+        self.assertEqual(certs, list(range(100, 123)))
+        self.assertEqual([params['offset'] for params in self.session.requests], [0, 5, 10, 15, 20])
+
+    def test_stream_quarter_rows(self):
+        async def collect(**kwargs):
+            return [row async for row in stream_quarter_rows(self.client(), '20230331', ['ASSET', 'DEPDOM'], **kwargs)]
+
+        rows = asyncio.run(collect())
+        self.assertEqual(len(rows), 23 * 2 - 1)
+        self.assertEqual(rows[:3], [('20230331', 100, 'ASSET', 1000), ('20230331', 100, 'DEPDOM', 100), ('20230331', 101, 'ASSET', 1010)])
+        self.assertNotIn(('20230331', 105, 'ASSET', 1050), rows)
+
+        rows = asyncio.run(collect(certs=[121, 102, 999], batch_size=2))
+        self.assertEqual([row[1] for row in rows], [102, 102, 121, 121])
+
+    def test_get_report_dates(self):
+        self.assertEqual(get_quarter_ends(2023, datetime.date(2024, 5, 1)), ['20230331', '20230630', '20230930', '20231231', '20240331'])
+        report_dates = asyncio.run(get_report_dates(self.client(), first_year=2022))
+        self.assertEqual(report_dates, ['20230930', '20230630', '20230331'])
+
+    def test_download_quarters(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            pd.DataFrame({'Date': ['20230331'], 'Cert': [1], 'Field': ['ASSET'], 'Value': [1]}).to_csv(os.path.join(output_dir, '20230331.csv'), index=False)
+            rows = asyncio.run(download_quarters(self.client(), REPORT_DATES, ['ASSET', 'DEPDOM'], output_dir))
+            self.assertEqual(rows, 2 * 23 * 2)
+            self.assertEqual(sorted(os.listdir(output_dir)), ['20230331.csv', '20230630.csv', '20230930.csv'])
+
+            quarter_df = pd.read_csv(os.path.join(output_dir, '20230930.csv'), dtype={'Date': str})
+            self.assertEqual(quarter_df.columns.tolist(), ['Date', 'Cert', 'Field', 'Value'])
+            self.assertEqual(quarter_df['Cert'].tolist(), [cert for cert in range(100, 123) for _ in range(2)])
+            self.assertEqual(quarter_df.iloc[1].tolist(), ['20230930', 100, 'DEPDOM', 101.0])
+
+    def test_retries(self):
+        with mock.patch.object(fdic_client.time, 'sleep') as sleep:
+            # Throttling and server errors are retried
+            self.session.errors = {'20230630': [429, 503]}
+            self.assertEqual(len(asyncio.run(get_certs(self.client(), '20230630'))), 23)
+            self.assertEqual(sleep.call_count, 2)
+
+            # A bad request would fail again, so it is not
+            self.session.errors = {'20230630': [400]}
+            self.session.requests.clear()
+            with self.assertRaises(requests.HTTPError):
+                asyncio.run(get_certs(self.client(), '20230630'))
+            self.assertEqual(len(self.session.requests), 1)
+            self.assertEqual(sleep.call_count, 2)
+
+    def test_failed_checks_and_quarters_do_not_stop_the_others(self):
+        self.session.errors = {'20230630': [400] * 10}
+        with self.assertLogs('src.data_download.fdic_client', level='WARNING'):
+            report_dates = asyncio.run(get_report_dates(self.client(), first_year=2023))
+        self.assertEqual(report_dates, ['20230930', '20230331'])
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            with self.assertLogs('src.data_download.fdic_client', level='ERROR') as logs:
+                with self.assertRaises(RuntimeError):
+                    asyncio.run(download_quarters(self.client(), REPORT_DATES, ['ASSET'], output_dir))
+            self.assertEqual(sorted(os.listdir(output_dir)), ['20230331.csv', '20230930.csv'])
+        self.assertIn('20230630', logs.output[0])
+
+    def test_failed_download_leaves_no_file(self):
+        def fail(url, params, timeout):
+            raise ValueError('connection lost')
+
+        self.session.get = fail
+        with tempfile.TemporaryDirectory() as output_dir:
+            with self.assertLogs('src.data_download.fdic_client', level='ERROR'):
+                with self.assertRaises(RuntimeError) as context:
+                    asyncio.run(download_quarters(self.client(), ['20230331'], ['ASSET'], output_dir))
+            self.assertIsInstance(context.exception.__cause__, ValueError)
+            self.assertEqual(os.listdir(output_dir), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import json
+import pstats
+import tempfile
+import unittest
+from src.data_download.instrumentation import finish_run, stage, start_run
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_run_report(self):
+        start_run('test_pipeline', profile=True, trace_memory=True)
+        with stage('outer') as record:
+            for _ in range(2):
+                with stage('inner', rows=10):
+                    sum(range(1000))
+            record['rows'] = 20
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(finish_run(tmp_dir)) as f:
+                report = json.load(f)
+
+        self.assertEqual(report['pipeline'], 'test_pipeline')
+        self.assertEqual([record['name'] for record in report['stages']], ['outer/inner', 'outer/inner', 'outer'])
+        self.assertEqual(report['totals']['outer/inner'], {'count': 2, 'seconds': report['totals']['outer/inner']['seconds'], 'rows': 20})
+        self.assertIn('top_functions', report['stages'][-1])
+        self.assertIn('python_peak_mb', report['stages'][0])
+
+    def test_parent_peak_includes_work_before_children(self):
+        start_run('test_pipeline', trace_memory=True)
+        with stage('outer'):
+            block = bytearray(20 * 1024 * 1024)
+            del block
+            with stage('inner'):
+                sum(range(1000))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(finish_run(tmp_dir)) as f:
+                report = json.load(f)
+
+        peaks = {record['name']: record['python_peak_mb'] for record in report['stages']}
+        self.assertGreaterEqual(peaks['outer'], 20)
+        self.assertLess(peaks['outer/inner'], 20)
+
+    def test_repeated_stage_profiles_are_merged(self):
+        def work():
+            return sum(range(1000))
+
+        start_run('test_pipeline', profile=True)
+        for _ in range(3):
+            with stage('read_quarter'):
+                work()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            finish_run(tmp_dir)
+            profile_files = [file_name for file_name in os.listdir(tmp_dir) if file_name.endswith('.prof')]
+            self.assertEqual(len(profile_files), 1)
+            stats = pstats.Stats(os.path.join(tmp_dir, profile_files[0]))
+
+        calls = [entry[1] for (_, _, function), entry in stats.stats.items() if function == 'work']
+        self.assertEqual(calls, [3])
+
+    def test_stage_without_run(self):
+        with stage('unrecorded') as record:
+            record['rows'] = 1
+        self.assertIsNone(finish_run())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from benchmarks.synthetic_data import generate_dataset
+from src.data_download.pipeline import STAGES, check_outputs, get_dependencies, run_pipeline
+
+class TestPipeline(unittest.TestCase):
+
+    def test_dependencies(self):
+        dependencies = get_dependencies(STAGES)
+        self.assertEqual(dependencies['fdic_download'], set())
+        self.assertEqual(dependencies['fred_download'], set())
+        self.assertEqual(dependencies['rank_assets'], {'fdic_download'})
+        self.assertEqual(dependencies['modeling_table'], {'fdic_download', 'fred_download', 'rank_assets'})
+
+    def test_rejects_shared_outputs(self):
+        check_outputs(STAGES)
+        stages = STAGES + [{'name': 'rewrite_table', 'script': 'scratch.py', 'inputs': [], 'outputs': ['data/processed/./bank_data_rank200.csv']}]
+        with self.assertRaises(ValueError):
+            check_outputs(stages)
+        with self.assertRaises(ValueError):
+            run_pipeline(stages, dry_run=True)
+        with self.assertRaises(ValueError):
+            check_outputs(STAGES + [{'name': 'quarter_extract', 'script': 'scratch.py', 'inputs': [], 'outputs': ['data/raw/fdic/extract.csv']}])
+
+    def test_skips_unchanged_stages(self):
+        stages = [stage for stage in STAGES if stage['name'] in ('fred_download', 'modeling_table')]
+        current_path = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            generate_dataset(os.path.join(tmp_dir, 'data'), n_certs=20, n_quarters=4)
+            os.chdir(tmp_dir)
+            try:
+                first = run_pipeline(stages)
+                second = run_pipeline(stages)
+                os.utime('data/raw/rates/fred_data.csv', (0, 0))
+                touched = run_pipeline(stages)
+                with open('data/raw/rates/fred_data.csv', 'a') as f:
+                    f.write('2024-04-01' + ',5.0' * 12 + '\n')
+                changed = run_pipeline(stages)
+            finally:
+                os.chdir(current_path)
+
+        self.assertEqual(first, {'fred_download': 'skipped', 'modeling_table': 'ran'})
+        self.assertEqual(second['modeling_table'], 'skipped')
+        self.assertEqual(touched['modeling_table'], 'skipped')
+        self.assertEqual(changed['modeling_table'], 'ran')
+
+if __name__ == "__main__":
+    unittest.main()
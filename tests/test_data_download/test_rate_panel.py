@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.data_download.rate_panel import is_rate_panel_current, load_fred_csv, prepare_rate_panel
+
+class TestRatePanel(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.fred_path = os.path.join(self.tmp_dir.name, 'fred_data.csv')
+        self.panel_path = os.path.join(self.tmp_dir.name, 'rate_panel')
+        dates = pd.date_range('2023-01-01', '2023-06-30', freq='B')
+        ff_e = np.where(np.arange(len(dates)) % 7 == 0, np.nan, np.linspace(4, 5, len(dates)))
+        pd.DataFrame({'ff_e': ff_e, 't_1m': np.linspace(3, 4, len(dates))}, index=dates).to_csv(self.fred_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_daily_and_quarterly_values(self):
+        panel = prepare_rate_panel(self.fred_path, self.panel_path)
+        daily = load_fred_csv(self.fred_path)
+        pd.testing.assert_frame_equal(panel['daily'], daily, check_freq=False)
+
+        quarterly = panel['quarterly']
+        self.assertEqual(quarterly.index.tolist(), [pd.Timestamp('2023-03-31'), pd.Timestamp('2023-06-30')])
+        self.assertAlmostEqual(quarterly.loc['2023-03-31', 'ff_e'], daily.loc[:'2023-03-31', 'ff_e'].iloc[-1])
+        self.assertAlmostEqual(quarterly.loc['2023-06-30', 't_1m_qavg'], daily.loc['2023-04-01':'2023-06-30', 't_1m'].mean())
+
+    def test_rebuilt_only_when_source_changes(self):
+        prepare_rate_panel(self.fred_path, self.panel_path)
+        os.utime(self.fred_path, (0, 0))
+        self.assertTrue(is_rate_panel_current(self.fred_path, self.panel_path))
+
+        with open(self.fred_path, 'a') as f:
+            f.write('2023-07-03,5.5,4.5\n')
+        self.assertFalse(is_rate_panel_current(self.fred_path, self.panel_path))
+        self.assertEqual(prepare_rate_panel(self.fred_path, self.panel_path)['daily']['ff_e'].iloc[-1], 0.055)
+
+if __name__ == "__main__":
+    unittest.main()
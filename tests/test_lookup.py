@@ -0,0 +1,60 @@
+import os
+import string
+import tempfile
+import unittest
+import pandas as pd
+from fuzzywuzzy import process
+from src.lookup import build_index, save_index, load_index, indexed_search, resolve_names
+
+class TestLookupIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Cert': [628, 3510, 7213, 6384, 33124],
+            'Best_Asset_Rank': [1, 2, 3, 4, 5],
+            'Institution_Name': [
+                'JPMorgan Chase Bank, National Association',
+                'Bank of America, National Association',
+                'Citibank, National Association',
+                'PNC Bank, National Association',
+                None,
+            ],
+        })
+        self.index = build_index(self.df)
+
+    def test_indexed_search(self):
+        results = indexed_search(self.index, 'Bank of America')
+        self.assertEqual(results.iloc[0]['Cert'], 3510)
+        self.assertIn('Score', results.columns)
+
+    def test_recall_of_long_names(self):
+        # Many short names sharing the query's leading trigrams, and one long name containing the whole query
+        names = [f'Bank of Ameri{a}{b}' for a in string.ascii_lowercase[:20] for b in string.ascii_lowercase[:20]]
+        df = pd.DataFrame({'Cert': range(len(names) + 1), 'Institution_Name': names + ['Bank of America, National Association']})
+        index = build_index(df)
+        for query in ['Bank of America', 'America National', 'Bank America NA']:
+            best_name, best_score = process.extractOne(query, df['Institution_Name'].tolist())
+            results = indexed_search(index, query)
+            self.assertEqual(results.iloc[0]['Score'], best_score)
+            if best_name == 'Bank of America, National Association':
+                self.assertEqual(results.iloc[0]['Institution_Name'], best_name)
+
+    def test_resolve_names(self):
+        results = resolve_names(self.index, ['citibank', 'JP Morgan Chase Bank', 'zzzz', 'citibank'])
+        self.assertEqual(results['Cert'].tolist()[:2], [7213, 628])
+        self.assertTrue(pd.isnull(results['Cert'].iloc[2]))
+        self.assertEqual(results['Cert'].iloc[3], 7213)
+
+    def test_load_index_rebuilds_when_source_changes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, 'institution_details.csv')
+            index_path = os.path.join(tmp_dir, 'institution_index.pkl')
+            self.df.to_csv(csv_path, index=False)
+            save_index(build_index(self.df.head(2)), index_path, csv_path)
+            self.assertEqual(len(load_index(index_path, csv_path)['names']), 2)
+
+            os.utime(csv_path, (0, 0))
+            self.assertEqual(len(load_index(index_path, csv_path)['names']), 5)
+
+if __name__ == "__main__":
+    unittest.main()